@@ -3,79 +3,186 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
+import os
 import time
-import uuid
-from typing import Any
+import weakref
+from functools import lru_cache
+from typing import TypedDict
 
-from fastapi import WebSocket
+import orjson
+from fastapi import WebSocket, WebSocketDisconnect
 
+import config
 from event_bus import bus
 
-# Connected agents: {ws: {"name": ..., "connected_at": ..., "takeover_sessions": set()}}
-_AGENTS: dict[WebSocket, dict[str, Any]] = {}
 
-# Sessions where an agent has taken over LLM: {session_id: agent_ws}
-_TAKEOVER: dict[str, WebSocket] = {}
+class AgentView(TypedDict):
+    """Agent entry as reported by /api/status."""
+    name: str
+    connected_at: float
+    takeover_sessions: list[str]
 
-# Pending turn requests awaiting agent reply: {request_id: Future}
-_PENDING_TURN: dict[str, asyncio.Future] = {}
 
+class AgentInfo:
+    """Per-connection agent state (slotted: attribute access, no per-key dict lookups)."""
 
-async def agent_connect(ws: WebSocket) -> None:
-    _AGENTS[ws] = {
-        "name": "agent",
-        "connected_at": time.time(),
-        "takeover_sessions": set(),
-    }
+    __slots__ = ("ws", "name", "connected_ns", "takeover_sessions", "pending_turns", "connected")
+
+    def __init__(self, ws: WebSocket, name: str, connected_ns: int) -> None:
+        self.ws = ws
+        self.name = name
+        self.connected_ns = connected_ns  # time.monotonic_ns()
+        self.takeover_sessions: set[str] = set()
+        # turn.request futures awaiting this agent's reply (released on disconnect)
+        self.pending_turns: set[asyncio.Future] = set()
+        self.connected = True
+
+
+# Connected agents, keyed by a per-connection integer id (cheaper to hash than
+# the WebSocket object): {agent_id: AgentInfo}
+_AGENTS: dict[int, AgentInfo] = {}
+
+# Reverse map, only needed to resolve a socket to its id: {ws: agent_id}
+_WS_ID: weakref.WeakKeyDictionary[WebSocket, int] = weakref.WeakKeyDictionary()
+
+_NEXT_ID = itertools.count()
+
+# Anchor for converting monotonic connect times to epoch seconds on output
+_EPOCH_AT_MONO_ZERO = time.time() - time.monotonic_ns() / 1e9
+
+# Event loop serving the agent sockets, captured at connect so the per-turn
+# path can create futures without asking asyncio for the running loop.
+_agent_loop: asyncio.AbstractEventLoop | None = None
+
+# Sessions where an agent has taken over LLM: {session_id: AgentInfo}
+# AgentInfo.connected is the liveness flag, so a hit costs a single dict probe.
+_TAKEOVER: dict[str, AgentInfo] = {}
+
+# Pending turn requests awaiting agent reply, sharded by the low bits of the
+# request id: _PENDING_TURN[request_id & _PENDING_MASK] = {request_id: Future}
+# Ids are process-local ints; they only become strings on the wire.
+_PENDING_MASK = 15
+_PENDING_TURN: list[dict[int, asyncio.Future]] = [{} for _ in range(_PENDING_MASK + 1)]
+_REQUEST_IDS = itertools.count(1)
+
+# Turn requests in flight, for coalescing duplicates: {(session_id, transcript): Future}
+_INFLIGHT: dict[tuple[str, str], asyncio.Future] = {}
+
+# Wire request_ids carry a per-process nonce so a late reply addressed to a
+# previous gateway process can never resolve a turn in this one.
+_REQUEST_ID_PREFIX = os.urandom(4).hex() + "-"
+
+# agent.connected / agent.disconnected are conflated: at most one broadcast per
+# window, carrying the latest agent_count (reconnect storms fan out once).
+_COUNT_WINDOW_S = 0.05
+_count_event = ""
+_count_handle: asyncio.TimerHandle | None = None
+_count_tasks: set[asyncio.Task] = set()
+
+
+@lru_cache(maxsize=4096)
+def _session_data(session_id: str) -> bytes:
+    """Pre-encoded ``{"session_id": ...}`` event data for takeover/release."""
+    return orjson.dumps({"session_id": session_id})
+
+
+def _schedule_count_publish(event_type: str) -> None:
+    global _count_event, _count_handle
+    _count_event = event_type
+    if _count_handle is None:
+        _count_handle = asyncio.get_running_loop().call_later(_COUNT_WINDOW_S, _flush_count)
+
+
+def _flush_count() -> None:
+    global _count_handle
+    _count_handle = None
+    task = asyncio.ensure_future(bus.publish(_count_event, {"agent_count": len(_AGENTS)}))
+    _count_tasks.add(task)
+    task.add_done_callback(_count_tasks.discard)
+
+
+async def agent_connect(ws: WebSocket) -> bool:
+    """Register an agent socket.  Returns False if the registry is full."""
+    global _agent_loop
+    if len(_AGENTS) >= config.get("max_agents", 1024):
+        return False
+    _agent_loop = asyncio.get_running_loop()
+    aid = next(_NEXT_ID)
+    _WS_ID[ws] = aid
+    _AGENTS[aid] = AgentInfo(ws, "agent", time.monotonic_ns())
     await bus.subscribe(ws)
-    await bus.publish("agent.connected", {"agent_count": len(_AGENTS)})
+    _schedule_count_publish("agent.connected")
+    return True
 
 
 async def agent_disconnect(ws: WebSocket) -> None:
-    info = _AGENTS.pop(ws, None)
-    await bus.unsubscribe(ws)
-    # Release any takeovers this agent held
-    if info:
-        for sid in list(info.get("takeover_sessions", set())):
+    aid = _WS_ID.pop(ws, None)
+    info = _AGENTS.pop(aid, None) if aid is not None else None
+    if info is not None:
+        info.connected = False
+        # Release any takeovers this agent held (set is already detached — no copy)
+        for sid in info.takeover_sessions:
             _TAKEOVER.pop(sid, None)
-    await bus.publish("agent.disconnected", {"agent_count": len(_AGENTS)})
+        info.takeover_sessions.clear()
+        # Turns waiting on this agent fall back to the local LLM now, not at timeout
+        for future in info.pending_turns:
+            if not future.done():
+                future.set_result(None)
+        info.pending_turns.clear()
+    await bus.unsubscribe(ws)
+    _schedule_count_publish("agent.disconnected")
 
 
 def get_takeover_agent(session_id: str) -> WebSocket | None:
     """If an agent has taken over this session's LLM, return its WebSocket."""
-    ws = _TAKEOVER.get(session_id)
-    if ws and ws in _AGENTS:
-        return ws
-    # Clean up stale takeover
-    _TAKEOVER.pop(session_id, None)
-    return None
+    info = _TAKEOVER.get(session_id)
+    if info is None:
+        return None
+    if not info.connected:
+        # Clean up stale takeover
+        _TAKEOVER.pop(session_id, None)
+        return None
+    return info.ws
 
 
 async def takeover(ws: WebSocket, session_id: str) -> bool:
-    if ws not in _AGENTS:
+    info = _AGENTS.get(_WS_ID.get(ws, -1))
+    if info is None:
         return False
-    _TAKEOVER[session_id] = ws
-    _AGENTS[ws]["takeover_sessions"].add(session_id)
-    await bus.publish("agent.takeover", {"session_id": session_id}, session_id=session_id)
+    prev = _TAKEOVER.get(session_id)
+    if prev is not None and prev is not info:
+        # Taken from another agent — keep each session in exactly one takeover set
+        prev.takeover_sessions.discard(session_id)
+    _TAKEOVER[session_id] = info
+    info.takeover_sessions.add(session_id)
+    await bus.publish("agent.takeover", _session_data(session_id), session_id=session_id)
     return True
 
 
 async def release(ws: WebSocket, session_id: str) -> bool:
-    if _TAKEOVER.get(session_id) is not ws:
+    info = _TAKEOVER.get(session_id)
+    if info is None or info.ws is not ws:
         return False
-    _TAKEOVER.pop(session_id, None)
-    if ws in _AGENTS:
-        _AGENTS[ws]["takeover_sessions"].discard(session_id)
-    await bus.publish("agent.release", {"session_id": session_id}, session_id=session_id)
+    del _TAKEOVER[session_id]
+    info.takeover_sessions.discard(session_id)
+    await bus.publish("agent.release", _session_data(session_id), session_id=session_id)
     return True
 
 
-def list_agents() -> list[dict[str, Any]]:
+def release_session(session_id: str) -> None:
+    """Drop any agent takeover of a session (called when the session ends)."""
+    info = _TAKEOVER.pop(session_id, None)
+    if info is not None:
+        info.takeover_sessions.discard(session_id)
+
+
+def list_agents() -> list[AgentView]:
     return [
         {
-            "name": info["name"],
-            "connected_at": info["connected_at"],
-            "takeover_sessions": list(info["takeover_sessions"]),
+            "name": info.name,
+            "connected_at": _EPOCH_AT_MONO_ZERO + info.connected_ns / 1e9,
+            "takeover_sessions": list(info.takeover_sessions),
         }
         for info in _AGENTS.values()
     ]
@@ -87,29 +194,67 @@ def list_agents() -> list[dict[str, Any]]:
 
 async def send_turn_request(
     ws: WebSocket, session_id: str, transcript: str, timeout: float = 30,
+    coalesce: bool = True,
 ) -> str | None:
     """Send turn.request to agent and await reply via the WS loop.
 
     The WS loop (in app.py agent_ws) is the sole reader on the socket.
     When it receives a message with a matching ``request_id`` it resolves the
     future created here.  Returns reply text or None on timeout / error.
+
+    With ``coalesce`` (default), a request for the same session + transcript
+    that is already in flight (e.g. a phone retry) awaits the existing reply
+    instead of sending a second ``turn.request``.  Such a duplicate gets the
+    owner's reply, or None if the owner times out / disconnects.
     """
-    request_id = uuid.uuid4().hex
-    loop = asyncio.get_running_loop()
-    future = loop.create_future()
-    _PENDING_TURN[request_id] = future
+    key = (session_id, transcript)
+    shared = _INFLIGHT.get(key) if coalesce else None
+    if shared is not None:
+        try:
+            async with asyncio.timeout(timeout):
+                return await asyncio.shield(shared)
+        except TimeoutError:
+            return None
+
+    request_id = next(_REQUEST_IDS)
+    future = (_agent_loop or asyncio.get_running_loop()).create_future()
+    pending = _PENDING_TURN[request_id & _PENDING_MASK]
+    pending[request_id] = future
+    if coalesce:
+        _INFLIGHT[key] = future
+    aid = _WS_ID.get(ws)
+    info = _AGENTS.get(aid) if aid is not None else None
+    if info is not None:
+        info.pending_turns.add(future)
     try:
-        await ws.send_json({
+        # Text frame: the OpenClaw bridge JSON.parse()s String(event.data).
+        # Sent through the bus so it stays ordered with events already queued for ws.
+        sent = await bus.send(ws, orjson.dumps({
             "type": "turn.request",
             "session_id": session_id,
             "transcript": transcript,
-            "request_id": request_id,
-        })
-        return await asyncio.wait_for(future, timeout=timeout)
-    except (asyncio.TimeoutError, Exception):
+            "request_id": f"{_REQUEST_ID_PREFIX}{request_id:x}",
+        }).decode())
+        if not sent:
+            print("[gateway] turn.request dropped: agent outbox full")
+            return None
+        async with asyncio.timeout(timeout):
+            # Shielded so our timeout doesn't cancel a future others may await
+            return await asyncio.shield(future)
+    except TimeoutError:
+        return None
+    except (WebSocketDisconnect, RuntimeError, OSError) as exc:
+        # Socket closed under us — caller falls back to the local LLM
+        print(f"[gateway] turn.request to agent failed: {exc!r}")
         return None
     finally:
-        _PENDING_TURN.pop(request_id, None)
+        pending.pop(request_id, None)
+        if info is not None:
+            info.pending_turns.discard(future)
+        if coalesce and _INFLIGHT.get(key) is future:
+            del _INFLIGHT[key]
+        if not future.done():
+            future.set_result(None)  # release coalesced waiters
 
 
 def resolve_turn_reply(request_id: str, reply: str) -> bool:
@@ -117,7 +262,13 @@ def resolve_turn_reply(request_id: str, reply: str) -> bool:
 
     Returns True if the request_id matched a pending future.
     """
-    future = _PENDING_TURN.get(request_id)
+    if not request_id.startswith(_REQUEST_ID_PREFIX):
+        return False
+    try:
+        rid = int(request_id[len(_REQUEST_ID_PREFIX):], 16)
+    except ValueError:
+        return False
+    future = _PENDING_TURN[rid & _PENDING_MASK].get(rid)
     if future and not future.done():
         future.set_result(reply)
         return True
@@ -3,17 +3,21 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+import binascii
+import hmac
 import json
 import re
-import tempfile
+import secrets
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 
 import httpx
+import orjson
 
 import agent_interface
 import config
@@ -23,27 +27,116 @@ import session_store
 import voice_pipeline
 from event_bus import bus
 
-app = FastAPI(title="Local Voice Gateway", version="0.1.0")
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (FastAPI's own ORJSONResponse is deprecated)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _config_body(name: Hashable, build: Callable[[], Any]) -> bytes:
+    """build() encoded once per config generation."""
+    return config.derived(name, lambda: orjson.dumps(build(), option=orjson.OPT_NON_STR_KEYS))
+
+
+def _cached_json(name: Hashable, build: Callable[[], Any]) -> Response:
+    """JSON response whose body is encoded once per config generation."""
+    return Response(_config_body(name, build), media_type="application/json")
+
+
+async def _publish_config(event_type: str, name: Hashable, build: Callable[[], dict]) -> Response:
+    """After a config save: broadcast the view and reply {"ok": true, ...view}, encoding it once.
+
+    The encoded view also primes the GET cache. build() must return a non-empty dict.
+    """
+    body = _config_body(name, build)
+    await bus.publish(event_type, body)
+    return Response(b'{"ok":true,' + body[1:], media_type="application/json")
+
+
+async def _read_json(request: Request) -> Any:
+    """Request body parsed with orjson."""
+    return orjson.loads(await request.body())
+
+
+async def _ws_send(ws: WebSocket, message: dict) -> None:
+    """Send *message* as a JSON text frame (clients parse frames as text).
+
+    Subscribed sockets go through their bus outbox, so replies stay ordered
+    with broadcast events and the receive loop never waits on the network.
+    """
+    await bus.send(ws, orjson.dumps(message).decode())
+
+
+# Fixed WS replies, encoded once (pong is the most frequent frame)
+_PONG_FRAME = orjson.dumps({"type": "pong"}).decode()
+# Keepalive exactly as the UI and the OpenClaw bridge send it (JSON.stringify({type: "ping"}))
+_PING_TEXT = '{"type":"ping"}'
+_END_SESSION_NACK_FRAME = orjson.dumps({"type": "end_session.ack", "ok": False}).decode()
+
+
+app = FastAPI(title="Local Voice Gateway", version="0.1.0", default_response_class=ORJSONResponse)
 
 _ROOT = Path(__file__).resolve().parent
-_TMP_DIR = _ROOT / "tmp"
-_TMP_DIR.mkdir(parents=True, exist_ok=True)
 _STATIC_DIR = _ROOT / "static"
 _START_TIME = time.time()
+_LLM_PRELOADED = False  # set once startup's llm_backend.preload() has finished
+_LLM_PRELOAD_ERROR = ""  # why it failed, if it did (ready, but degraded)
+
+# Strong refs to fire-and-forget startup tasks (the loop only keeps weak ones)
+_BACKGROUND: set[asyncio.Task] = set()
 _CALL_COUNT = 0
 _ERROR_COUNT = 0
 
+# Blocking model calls run on one small pool per model rather than the shared
+# default executor: mlx_audio and a local MLX LLM serve one request at a time,
+# so extra threads would only contend for the GPU.  A remote LLM backend may
+# serve requests in parallel, hence llm_workers.
+_ASR_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr")
+_TTS_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+_LLM_POOL = ThreadPoolExecutor(max_workers=max(1, int(config.get("llm_workers", 1))), thread_name_prefix="llm")
+
+T = TypeVar("T")
+
+
+async def _run_in(pool: ThreadPoolExecutor, fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+# Keep-alive client for backend calls made straight from request handlers.
+# Opened on first use, closed at shutdown.
+_HTTP: httpx.AsyncClient | None = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _HTTP
+    if _HTTP is None or _HTTP.is_closed:
+        _HTTP = httpx.AsyncClient(timeout=180)
+    return _HTTP
+
+
+# Passphrase matching ignores punctuation
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+# Fixed replies; their audio comes from voice_pipeline.synthesize_cached
+_DEFAULT_REJECT = "I'm sorry, I can't help you right now. Goodbye."
+_AUTH_OK_REPLY = "Authentication successful. How can I help you?"
+_AUTH_RETRY_REPLY = "That's not correct. Please try again."
+_UNHEARD_REPLY = "I could not hear that clearly. Please try again."
+
 
 # ---------------------------------------------------------------------------
 # Auth
 # ---------------------------------------------------------------------------
 
 def _check_bearer(request: Request) -> None:
-    token = config.get("bearer_token", "")
-    if not token:
+    expected = config.expected_auth_header()
+    if not expected:
         return
-    auth = request.headers.get("authorization", "")
-    if auth != f"Bearer {token}":
+    # Starlette decodes headers as latin-1, so this recovers the raw bytes
+    auth = request.headers.get("authorization", "").encode("latin-1")
+    if not hmac.compare_digest(auth, expected):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
@@ -51,67 +144,252 @@ def _check_bearer(request: Request) -> None:
 # Phone API endpoints
 # ---------------------------------------------------------------------------
 
+def _upload_name(audio: UploadFile) -> str:
+    """Filename to forward to ASR; mlx_audio sniffs the format from the suffix."""
+    name = audio.filename or "turn.wav"
+    return name if Path(name).suffix else f"{name}.wav"
+
+
+def _check_audio_size(audio: UploadFile) -> None:
+    """Reject uploads over max_audio_bytes; ASR reads the whole file into memory."""
+    limit = int(config.get("max_audio_bytes", 4 * 1024 * 1024))
+    size = audio.size if audio.size is not None else audio.file.seek(0, 2)
+    if size > limit:
+        raise HTTPException(status_code=413, detail=f"Audio too large: {size} bytes (max {limit})")
+
+
+def _audio_payload(audio_bytes: bytes) -> str:
+    """Base64 text for embedding WAV bytes in JSON."""
+    return binascii.b2a_base64(audio_bytes, newline=False).decode("ascii")
+
+
+def _audio_field(audio_bytes: bytes, as_url: bool) -> dict[str, str]:
+    """Reply audio for a turn response: inline base64, or a short-lived download URL."""
+    if as_url:
+        return {"audio_url": f"/api/audio/{session_store.put_audio(audio_bytes)}"}
+    return {"audio_base64": _audio_payload(audio_bytes)}
+
+
+def _turn_response(body: dict, audio_bytes: bytes, audio_mode: str) -> Response:
+    """Turn result carrying its reply audio in the form asked for by ``audio_format``."""
+    if audio_mode == "wav":
+        # The body is the WAV itself; the rest of the result rides in one ASCII-safe header
+        result = json.dumps(body, ensure_ascii=True, separators=(",", ":"))
+        return Response(audio_bytes, media_type="audio/wav", headers={"X-Turn-Result": result})
+    return ORJSONResponse({**body, **_audio_field(audio_bytes, audio_mode == "url")})
+
+
+async def _queue_inject(session_id: str, text: str) -> float:
+    """Synthesize *text* and queue it for the session's next /api/turn. Returns tts_ms."""
+    audio_bytes, tts_ms = await _run_in(_TTS_POOL, voice_pipeline.synthesize, text)
+    session_store.queue_inject(session_id, text, audio_bytes)
+    # Subscribers get a download link, not the WAV inlined into every frame
+    await bus.publish("agent.inject", {
+        "text": text,
+        **_audio_field(audio_bytes, as_url=True),
+        "tts_ms": round(tts_ms, 1),
+    }, session_id=session_id)
+    return tts_ms
+
+
 @app.get("/health")
-async def health(request: Request) -> JSONResponse:
+async def health(request: Request) -> ORJSONResponse:
     _check_bearer(request)
-    mlx_status = voice_pipeline.check_mlx_audio()
-    llm_status = llm_backend.check_health()
-    return JSONResponse({
+    mlx_status = await asyncio.to_thread(voice_pipeline.check_mlx_audio)
+    llm_status = llm_backend.check_health()  # no I/O, see its docstring
+    return ORJSONResponse({
         "ok": True,
         "mlx_audio": mlx_status,
         "llm": llm_status,
-        "active_sessions": len(session_store.active_sessions()),
+        "active_sessions": session_store.session_counts()[0],
         "uptime_s": round(time.time() - _START_TIME),
     })
 
 
+@app.get("/health/ready")
+async def health_ready(request: Request) -> ORJSONResponse:
+    """Readiness: 503 until the startup LLM preload has finished (or failed)."""
+    _check_bearer(request)
+    if not _LLM_PRELOADED:
+        return ORJSONResponse({"ok": False, "ready": False}, status_code=503)
+    if _LLM_PRELOAD_ERROR:
+        return ORJSONResponse({"ok": True, "ready": True, "degraded": True, "error": _LLM_PRELOAD_ERROR})
+    return ORJSONResponse({"ok": True, "ready": True})
+
+
 @app.post("/api/asr")
 async def api_asr(
     request: Request,
     audio: UploadFile = File(...),
-) -> JSONResponse:
+) -> ORJSONResponse:
     _check_bearer(request)
-    suffix = Path(audio.filename or "turn.wav").suffix or ".wav"
-    with tempfile.NamedTemporaryFile(dir=_TMP_DIR, suffix=suffix, delete=False) as tmp:
-        tmp_path = Path(tmp.name)
-        tmp.write(await audio.read())
+    _check_audio_size(audio)
+    await audio.seek(0)
     try:
-        transcript, asr_ms = await asyncio.to_thread(voice_pipeline.transcribe, tmp_path)
+        transcript, asr_ms = await _run_in(
+            _ASR_POOL, voice_pipeline.transcribe_fileobj, audio.file, _upload_name(audio),
+        )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"ASR failed: {exc}") from exc
-    finally:
-        tmp_path.unlink(missing_ok=True)
-    return JSONResponse({"transcript": transcript, "asr_ms": round(asr_ms, 1)})
+    return ORJSONResponse({"transcript": transcript, "asr_ms": round(asr_ms, 1)})
+
+
+@app.get("/api/audio/{token}")
+async def get_turn_audio(request: Request, token: str) -> Response:
+    """Audio parked by /api/turn (audio_format=url) or announced by an agent.inject event."""
+    _check_bearer(request)
+    wav = session_store.get_audio(token)
+    if wav is None:
+        raise HTTPException(status_code=404, detail="audio not found or expired")
+    return Response(wav, media_type="audio/wav")
 
 
 @app.post("/api/session/new")
-async def session_new(request: Request) -> JSONResponse:
+async def session_new(request: Request) -> ORJSONResponse:
     _check_bearer(request)
     sid = session_store.get_or_create()
-    return JSONResponse({"session_id": sid})
+    return ORJSONResponse({"session_id": sid})
 
 
 @app.post("/api/session/reset")
-async def session_reset(request: Request, session_id: str = Form("")) -> JSONResponse:
+async def session_reset(request: Request, session_id: str = Form("")) -> ORJSONResponse:
     _check_bearer(request)
     sid = voice_pipeline.safe_text(session_id)
     if sid:
         sid = session_store.reset(sid)
-    return JSONResponse({"ok": True, "session_id": sid})
+    return ORJSONResponse({"ok": True, "session_id": sid})
 
 
 @app.post("/api/session/end")
-async def session_end(request: Request) -> JSONResponse:
+async def session_end(request: Request) -> ORJSONResponse:
     """Mark a session as ended (call hung up)."""
     _check_bearer(request)
-    body = await request.json()
+    body = await _read_json(request)
     sid = voice_pipeline.safe_text(str(body.get("session_id", "")))
     if not sid:
         raise HTTPException(status_code=400, detail="session_id required")
     ok = session_store.end_session(sid)
     if ok:
         await bus.publish("session.ended", {"session_id": sid}, session_id=sid)
-    return JSONResponse({"ok": ok, "session_id": sid})
+    return ORJSONResponse({"ok": ok, "session_id": sid})
+
+
+async def _reject_caller(sid: str, number: str, reason: str, cfg: dict, audio_mode: str) -> Response:
+    """Turn away a filtered caller with the (cached) reject message."""
+    await bus.publish("turn.caller_rejected", {"number": number, "reason": reason}, session_id=sid)
+    reject_text = cfg.get("auth_reject_message", _DEFAULT_REJECT)
+    audio_bytes, _ = await _run_in(_TTS_POOL, voice_pipeline.synthesize_cached, reject_text)
+    return _turn_response({
+        "ok": False, "rejected": True, "reason": reason,
+        "session_id": sid, "reply": reject_text,
+    }, audio_bytes, audio_mode)
+
+
+async def _finish_turn(
+    sid: str, turn_ctx: session_store.SessionTurnCtx, transcript: str, reply: str,
+    start: float, asr_ms: float, audio_mode: str, progress: bool,
+    *, llm_ms: float = 0.0, llm_model: str = "", forced: bool = False,
+    synth: Callable[[str], tuple[bytes, float]] = voice_pipeline.synthesize_cached,
+    record: bool = True, **extra: Any,
+) -> Response:
+    """Common turn exit: TTS, record + save, turn.complete, response.
+
+    Fixed-text replies (forced, auth, unheard) use the default cached synth.
+    record=False answers without logging the turn (a coalesced duplicate).
+    """
+    if progress:
+        await bus.publish("turn.reply", {"reply": reply}, session_id=sid)
+
+    # Stale turn check: skip TTS if session was reset while we were processing
+    turn_ctx.check()
+    audio_bytes, tts_ms = await _run_in(_TTS_POOL, synth, reply)
+    # Check again after TTS (synthesis can be slow)
+    turn_ctx.check()
+
+    total_ms = (time.perf_counter() - start) * 1000
+    metrics = {
+        "asr_ms": round(asr_ms, 1),
+        "llm_ms": round(llm_ms, 1),
+        "tts_ms": round(tts_ms, 1),
+        "total_ms": round(total_ms, 1),
+        "llm_model": llm_model,
+    }
+
+    # Record turn for session persistence
+    if record:
+        session_store.record_turn(sid, {
+            "transcript": transcript,
+            "reply": reply,
+            "metrics": metrics,
+            "forced_reply": forced,
+        })
+        session_store.schedule_save(sid)
+
+    await bus.publish("turn.complete", {
+        "metrics": metrics,
+        "transcript": transcript,
+        "reply": reply,
+        "session_id": sid,
+    }, session_id=sid)
+
+    return _turn_response({
+        "ok": True,
+        "session_id": sid,
+        "transcript": transcript,
+        "reply": reply,
+        "metrics": metrics,
+        **extra,
+    }, audio_bytes, audio_mode)
+
+
+# Agent-routed turns still being answered, for retries to share:
+# {(session_id, transcript): Future[(reply, llm_model) | None]}
+_AGENT_TURNS: dict[tuple[str, str], asyncio.Future] = {}
+
+
+async def _generate_reply(
+    sid: str, transcript: str, agent_ws: WebSocket | None, cfg: dict,
+) -> tuple[str, float, str]:
+    """Reply from the takeover agent if there is one, else (or on its failure) the local LLM.
+
+    Returns (reply, llm_ms, llm_model).
+    """
+    if agent_ws is not None:
+        # Route to agent via single-reader pattern (request_id correlation)
+        takeover_timeout = cfg.get("agent_takeover_timeout", 60)
+        reply_text = await agent_interface.send_turn_request(
+            agent_ws, sid, transcript, timeout=takeover_timeout,
+        )
+        reply = voice_pipeline.safe_text(reply_text) if reply_text is not None else ""
+        if reply:
+            return reply, 0.0, "agent"
+        # Agent failed / timed out — fall back to local LLM
+
+    async with session_store.get_lock(sid):
+        # 1. Master instructions (never compacted)
+        system_prompt = instruction_store.build_system_prompt(sid)
+
+        # 2. Agent injected knowledge — merged into system prompt for maximum weight
+        knowledge = instruction_store.get_agent_knowledge(sid)
+        if knowledge:
+            system_prompt += f"\n\nIMPORTANT — use the following facts when answering:\n{knowledge}"
+
+        prompt = [{"role": "system", "content": system_prompt}]
+
+        # 3. Compacted summary of older conversation (if any)
+        summary = session_store.get_summary(sid)
+        if summary:
+            prompt.append({"role": "system", "content": f"Summary of earlier conversation:\n{summary}"})
+
+        # 4. Recent history (verbatim) + 5. current user turn, built in one pass
+        messages = [
+            *prompt,
+            *session_store.get_history(sid),
+            {"role": "user", "content": transcript},
+        ]
+
+        reply, llm_ms, llm_model = await _run_in(_LLM_POOL, llm_backend.generate, messages)
+    return reply, llm_ms, llm_model
 
 
 @app.post("/api/turn")
@@ -125,26 +403,32 @@ async def api_turn(
     forced_reply: str = Form(""),
     caller_number: str = Form(""),
     call_direction: str = Form(""),
-) -> JSONResponse:
+    audio_format: str = Form(""),
+) -> Response:
     global _CALL_COUNT, _ERROR_COUNT
     _check_bearer(request)
 
-    sid = voice_pipeline.safe_text(session_id) or uuid.uuid4().hex
+    # One config lookup for the whole turn
+    cfg = config.load()
+    # Intermediate turn.started/transcript/reply events (turn.complete always carries the full result)
+    progress = cfg.get("emit_progress_events", True)
+
+    sid = voice_pipeline.safe_text(session_id) or secrets.token_hex(16)
+    audio_mode = audio_format.strip().lower()
 
     # Reject turns for ended sessions (e.g. after forced hangup)
     if sid and session_store.is_ended(sid):
-        return JSONResponse({"ok": False, "session_id": sid, "ended": True, "detail": "session ended"})
+        return ORJSONResponse({"ok": False, "session_id": sid, "ended": True, "detail": "session ended"})
 
     sid = session_store.get_or_create(sid)
 
-    if reset_session.lower() == "true":
+    reset = reset_session.lower() == "true"
+    if reset:
         session_store.reset(sid)
         sid = session_store.get_or_create(sid)
 
     # Snapshot generation — if it changes mid-turn, this turn is stale
-    turn_gen = session_store.get_generation(sid)
-
-    cfg = config.load()
+    turn_ctx = session_store.SessionTurnCtx(sid)
 
     # --- Caller info ---
     caller_number_clean = voice_pipeline.safe_text(caller_number)
@@ -152,283 +436,154 @@ async def api_turn(
     if caller_number_clean:
         session_store.set_caller_info(sid, caller_number_clean, call_direction_clean)
 
+    normalized = session_store.normalize_number(caller_number_clean)
+
     # --- Caller history persistence ---
-    if reset_session.lower() == "true" and caller_number_clean:
-        normalized_caller = re.sub(r"[\s\-\(\)]", "", caller_number_clean)
-        if normalized_caller:
-            if cfg.get("keep_history", False):
-                prev = session_store.load_caller_history(normalized_caller)
-                if prev:
-                    for msg in prev.get("history", []):
-                        session_store.get_history(sid)  # ensure list exists
-                        session_store._HISTORY.setdefault(sid, []).append(msg)
-                    prev_summary = prev.get("summary", "")
-                    if prev_summary:
-                        session_store._SUMMARY[sid] = prev_summary
-            else:
-                session_store.delete_caller_history(normalized_caller)
+    if reset and normalized:
+        if cfg.get("keep_history", False):
+            prev = session_store.load_caller_history(normalized)
+            if prev:
+                session_store.extend_history(sid, prev.get("history", []))
+                prev_summary = prev.get("summary", "")
+                if prev_summary:
+                    session_store.set_summary(sid, prev_summary)
+        else:
+            session_store.delete_caller_history(normalized)
 
     # --- Caller filtering ---
-    normalized = re.sub(r"[\s\-\(\)]", "", caller_number_clean)
-    blocklist = cfg.get("caller_blocklist", [])
-    if normalized and normalized in blocklist:
-        await bus.publish("turn.caller_rejected", {"number": normalized, "reason": "blocklisted"}, session_id=sid)
-        reject_text = cfg.get("auth_reject_message", "I'm sorry, I can't help you right now. Goodbye.")
-        audio_bytes, _ = await asyncio.to_thread(voice_pipeline.synthesize, reject_text)
-        return JSONResponse({
-            "ok": False, "rejected": True, "reason": "blocklisted",
-            "session_id": sid, "reply": reject_text,
-            "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-        })
-
-    allowlist = cfg.get("caller_allowlist", [])
+    allowlist = config.allowlist_set()
+    if normalized and normalized in config.blocklist_set():
+        return await _reject_caller(sid, normalized, "blocklisted", cfg, audio_mode)
     if allowlist and normalized and normalized not in allowlist:
-        await bus.publish("turn.caller_rejected", {"number": normalized, "reason": "not_allowlisted"}, session_id=sid)
-        reject_text = cfg.get("auth_reject_message", "I'm sorry, I can't help you right now. Goodbye.")
-        audio_bytes, _ = await asyncio.to_thread(voice_pipeline.synthesize, reject_text)
-        return JSONResponse({
-            "ok": False, "rejected": True, "reason": "not_allowlisted",
-            "session_id": sid, "reply": reject_text,
-            "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-        })
-
+        return await _reject_caller(sid, normalized, "not_allowlisted", cfg, audio_mode)
     if not normalized and not cfg.get("unknown_callers_allowed", True):
-        await bus.publish("turn.caller_rejected", {"number": "", "reason": "unknown_caller"}, session_id=sid)
-        reject_text = cfg.get("auth_reject_message", "I'm sorry, I can't help you right now. Goodbye.")
-        audio_bytes, _ = await asyncio.to_thread(voice_pipeline.synthesize, reject_text)
-        return JSONResponse({
-            "ok": False, "rejected": True, "reason": "unknown_caller",
-            "session_id": sid, "reply": reject_text,
-            "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-        })
+        return await _reject_caller(sid, "", "unknown_caller", cfg, audio_mode)
 
-    # Touch session activity + sweep stale sessions
+    # Touch session activity (stale sessions are swept by _periodic_sweep)
     session_store.touch(sid)
-    stale = session_store.sweep_stale()
-    for stale_sid in stale:
-        await bus.publish("session.ended", {"session_id": stale_sid, "reason": "stale"}, session_id=stale_sid)
 
     # --- Pending TTS inject? Return it immediately, skip ASR/LLM ---
     pending = session_store.drain_inject(sid)
     if pending:
-        await bus.publish("turn.started", {"session_id": sid}, session_id=sid)
-        await bus.publish("turn.reply", {"reply": pending["text"]}, session_id=sid)
+        if progress:
+            await bus.publish("turn.started", {"session_id": sid}, session_id=sid)
+            await bus.publish("turn.reply", {"reply": pending["text"]}, session_id=sid)
         await bus.publish("turn.complete", {
             "metrics": {"asr_ms": 0, "llm_ms": 0, "tts_ms": 0, "total_ms": 0},
             "transcript": "", "reply": pending["text"], "model": "inject",
         }, session_id=sid)
-        return JSONResponse({
-            "ok": True, "session_id": sid, "transcript": "",
-            "reply": pending["text"], "audio_base64": pending["audio_base64"],
+        return _turn_response({
+            "ok": True, "session_id": sid, "transcript": "", "reply": pending["text"],
             "asr_ms": 0, "llm_ms": 0, "tts_ms": 0, "total_ms": 0,
             "model": "inject",
-        })
+        }, pending["audio"], audio_mode)
 
     start = time.perf_counter()
     _CALL_COUNT += 1
 
-    await bus.publish("turn.started", {"session_id": sid}, session_id=sid)
-
-    transcript = ""
-    reply = ""
-    asr_ms = 0.0
-    llm_ms = 0.0
-    tts_ms = 0.0
-    llm_model = ""
+    if progress:
+        await bus.publish("turn.started", {"session_id": sid}, session_id=sid)
 
     try:
         # --- forced_reply: skip ASR + LLM, go straight to TTS ---
         forced = voice_pipeline.safe_text(forced_reply)
         if forced:
-            transcript = ""
-            reply = forced
+            return await _finish_turn(sid, turn_ctx, "", forced, start, 0.0, audio_mode, progress,
+                                      forced=True)
+
+        # --- ASR ---
+        skip = skip_asr.strip().lower() == "true"
+        hint = voice_pipeline.safe_text(transcript_hint)
+
+        if skip and hint:
+            transcript = hint
             asr_ms = 0.0
-            llm_ms = 0.0
         else:
-            # --- ASR ---
-            skip = skip_asr.strip().lower() == "true"
-            hint = voice_pipeline.safe_text(transcript_hint)
-
-            if skip and hint:
+            _check_audio_size(audio)
+            await audio.seek(0)
+            try:
+                transcript, asr_ms = await _run_in(
+                    _ASR_POOL, voice_pipeline.transcribe_fileobj, audio.file, _upload_name(audio),
+                )
+            except Exception as exc:
+                _ERROR_COUNT += 1
+                raise HTTPException(status_code=400, detail=f"ASR failed: {exc}") from exc
+
+            # Fallback to hint
+            if not transcript and hint:
                 transcript = hint
-                asr_ms = 0.0
-            else:
-                suffix = Path(audio.filename or "turn.wav").suffix or ".wav"
-                with tempfile.NamedTemporaryFile(dir=_TMP_DIR, suffix=suffix, delete=False) as tmp:
-                    tmp_path = Path(tmp.name)
-                    tmp.write(await audio.read())
-                try:
-                    transcript, asr_ms = await asyncio.to_thread(voice_pipeline.transcribe, tmp_path)
-                except Exception as exc:
-                    _ERROR_COUNT += 1
-                    raise HTTPException(status_code=400, detail=f"ASR failed: {exc}") from exc
-                finally:
-                    tmp_path.unlink(missing_ok=True)
-
-                # Fallback to hint
-                if not transcript and hint:
-                    transcript = hint
 
+        if progress:
             await bus.publish("turn.transcript", {"transcript": transcript}, session_id=sid)
 
-            # --- Passphrase auth gate ---
-            passphrase = cfg.get("auth_passphrase", "")
-            if passphrase and transcript and not session_store.is_authenticated(sid):
-                # Fuzzy match: case-insensitive, strip punctuation, substring
-                clean_phrase = re.sub(r"[^\w\s]", "", passphrase.lower()).strip()
-                clean_input = re.sub(r"[^\w\s]", "", transcript.lower()).strip()
-                if clean_phrase in clean_input:
-                    session_store.mark_authenticated(sid)
-                    reply = "Authentication successful. How can I help you?"
-                    llm_ms = 0.0
-                    await bus.publish("turn.authenticated", {"session_id": sid}, session_id=sid)
-                else:
-                    attempts = session_store.record_auth_attempt(sid)
-                    max_attempts = cfg.get("auth_max_attempts", 3)
-                    await bus.publish("turn.auth_failed", {"session_id": sid, "attempt": attempts}, session_id=sid)
-                    if max_attempts > 0 and attempts >= max_attempts:
-                        reply = cfg.get("auth_reject_message", "I'm sorry, I can't help you right now. Goodbye.")
-                        llm_ms = 0.0
-                        # Skip LLM, go to TTS, include hangup
-                        await bus.publish("turn.reply", {"reply": reply}, session_id=sid)
-                        audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, reply)
-                        total_ms = (time.perf_counter() - start) * 1000
-                        metrics = {"asr_ms": round(asr_ms, 1), "llm_ms": 0.0, "tts_ms": round(tts_ms, 1),
-                                   "total_ms": round(total_ms, 1), "llm_model": ""}
-                        session_store.record_turn(sid, {"transcript": transcript, "reply": reply,
-                                                        "metrics": metrics, "forced_reply": False})
-                        session_store.save_session(sid)
-                        await bus.publish("turn.complete", {"metrics": metrics, "transcript": transcript,
-                                                            "reply": reply, "session_id": sid}, session_id=sid)
-                        return JSONResponse({
-                            "ok": True, "session_id": sid, "transcript": transcript, "reply": reply,
-                            "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-                            "metrics": metrics, "hangup": True,
-                        })
-                    else:
-                        reply = "That's not correct. Please try again."
-                        llm_ms = 0.0
-
-                # Auth handled — skip LLM, go to TTS
-                await bus.publish("turn.reply", {"reply": reply}, session_id=sid)
-                audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, reply)
-                total_ms = (time.perf_counter() - start) * 1000
-                metrics = {"asr_ms": round(asr_ms, 1), "llm_ms": 0.0, "tts_ms": round(tts_ms, 1),
-                           "total_ms": round(total_ms, 1), "llm_model": ""}
-                session_store.record_turn(sid, {"transcript": transcript, "reply": reply,
-                                                "metrics": metrics, "forced_reply": False})
-                session_store.save_session(sid)
-                await bus.publish("turn.complete", {"metrics": metrics, "transcript": transcript,
-                                                    "reply": reply, "session_id": sid}, session_id=sid)
-                return JSONResponse({
-                    "ok": True, "session_id": sid, "transcript": transcript, "reply": reply,
-                    "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-                    "metrics": metrics,
-                })
-
-            # --- LLM ---
-            if not transcript:
-                transcript = ""
-                reply = "I could not hear that clearly. Please try again."
-                llm_ms = 0.0
-            else:
-                # Check if agent has taken over LLM for this session
-                agent_ws = agent_interface.get_takeover_agent(sid)
-                if agent_ws is not None:
-                    # Route to agent via single-reader pattern (request_id correlation)
-                    takeover_timeout = config.get("agent_takeover_timeout", 60)
-                    reply_text = await agent_interface.send_turn_request(
-                        agent_ws, sid, transcript, timeout=takeover_timeout,
-                    )
-                    if reply_text is not None:
-                        reply = voice_pipeline.safe_text(reply_text)
-                        llm_ms = 0.0
-                        llm_model = "agent"
-                    else:
-                        # Agent failed / timed out — fall back to local LLM
-                        agent_ws = None
-
-                if agent_ws is None and not reply:
-                    async with session_store.get_lock(sid):
-                        # 1. Master instructions (never compacted)
-                        system_prompt = instruction_store.build_system_prompt(sid)
-
-                        # 2. Agent injected knowledge — merged into system prompt for maximum weight
-                        knowledge = instruction_store.get_agent_knowledge(sid)
-                        if knowledge:
-                            system_prompt += f"\n\nIMPORTANT — use the following facts when answering:\n{knowledge}"
-
-                        messages = [{"role": "system", "content": system_prompt}]
-
-                        # 3. Compacted summary of older conversation (if any)
-                        summary = session_store.get_summary(sid)
-                        if summary:
-                            messages.append({"role": "system", "content": f"Summary of earlier conversation:\n{summary}"})
-
-                        # 4. Recent history (verbatim)
-                        history = session_store.get_history(sid)
-                        messages.extend(history)
-
-                        # 5. Current user turn
-                        messages.append({"role": "user", "content": transcript})
-
-                        reply, llm_ms, llm_model = await asyncio.to_thread(llm_backend.generate, messages)
-
-                # Commit to history + compact once (after both messages)
-                session_store.append(sid, "user", transcript)
-                session_store.append(sid, "assistant", reply)
-                session_store.compact(sid)
-
-        await bus.publish("turn.reply", {"reply": reply}, session_id=sid)
-
-        # --- Stale turn check: abort if session was reset while we were processing ---
-        if session_store.get_generation(sid) != turn_gen:
-            await bus.publish("turn.stale", {"session_id": sid, "reason": "generation_changed"}, session_id=sid)
-            return JSONResponse({"ok": False, "session_id": sid, "stale": True, "detail": "session reset during turn"})
-
-        # --- TTS ---
-        audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, reply)
-
-        # Check again after TTS (synthesis can be slow)
-        if session_store.get_generation(sid) != turn_gen:
-            await bus.publish("turn.stale", {"session_id": sid, "reason": "generation_changed"}, session_id=sid)
-            return JSONResponse({"ok": False, "session_id": sid, "stale": True, "detail": "session reset during turn"})
-
-        total_ms = (time.perf_counter() - start) * 1000
-
-        metrics = {
-            "asr_ms": round(asr_ms, 1),
-            "llm_ms": round(llm_ms, 1),
-            "tts_ms": round(tts_ms, 1),
-            "total_ms": round(total_ms, 1),
-            "llm_model": llm_model,
-        }
-
-        # Record turn for session persistence
-        session_store.record_turn(sid, {
-            "transcript": transcript,
-            "reply": reply,
-            "metrics": metrics,
-            "forced_reply": bool(forced),
-        })
-        session_store.save_session(sid)
-
-        await bus.publish("turn.complete", {
-            "metrics": metrics,
-            "transcript": transcript,
-            "reply": reply,
-            "session_id": sid,
-        }, session_id=sid)
-
-        return JSONResponse({
-            "ok": True,
-            "session_id": sid,
-            "transcript": transcript,
-            "reply": reply,
-            "audio_base64": base64.b64encode(audio_bytes).decode("ascii"),
-            "metrics": metrics,
-        })
-
+        # --- Passphrase auth gate ---
+        passphrase = cfg.get("auth_passphrase", "")
+        if passphrase and transcript and not session_store.is_authenticated(sid):
+            # Fuzzy match: case-insensitive, strip punctuation, substring
+            clean_phrase = config.derived(
+                "auth_passphrase_clean", lambda: _PUNCT_RE.sub("", passphrase.lower()).strip(),
+            )
+            clean_input = _PUNCT_RE.sub("", transcript.lower()).strip()
+            if clean_phrase in clean_input:
+                session_store.mark_authenticated(sid)
+                await bus.publish("turn.authenticated", {"session_id": sid}, session_id=sid)
+                return await _finish_turn(sid, turn_ctx, transcript, _AUTH_OK_REPLY,
+                                          start, asr_ms, audio_mode, progress)
+            attempts = session_store.record_auth_attempt(sid)
+            max_attempts = cfg.get("auth_max_attempts", 3)
+            await bus.publish("turn.auth_failed", {"session_id": sid, "attempt": attempts}, session_id=sid)
+            if max_attempts > 0 and attempts >= max_attempts:
+                # Out of attempts: reject message, then the phone hangs up
+                reject_text = cfg.get("auth_reject_message", _DEFAULT_REJECT)
+                return await _finish_turn(sid, turn_ctx, transcript, reject_text,
+                                          start, asr_ms, audio_mode, progress, hangup=True)
+            return await _finish_turn(sid, turn_ctx, transcript, _AUTH_RETRY_REPLY,
+                                      start, asr_ms, audio_mode, progress)
+
+        if not transcript:
+            return await _finish_turn(sid, turn_ctx, "", _UNHEARD_REPLY, start, asr_ms, audio_mode, progress)
+
+        # --- LLM ---
+        # Check if agent has taken over LLM for this session
+        agent_ws = agent_interface.get_takeover_agent(sid)
+        key = (sid, transcript)
+        shared = _AGENT_TURNS.get(key) if agent_ws is not None else None
+        if shared is not None:
+            # A retry of a turn that is still being answered reuses that turn's final
+            # reply (agent or local fallback); the original records the exchange.
+            result = await asyncio.shield(shared)
+            if result is None:
+                return ORJSONResponse({"ok": False, "session_id": sid, "duplicate": True,
+                                       "detail": "original turn failed"})
+            reply, llm_model = result
+            return await _finish_turn(sid, turn_ctx, transcript, reply, start, asr_ms, audio_mode, progress,
+                                      llm_model=llm_model, synth=voice_pipeline.synthesize, record=False)
+
+        owner = None
+        if agent_ws is not None:
+            owner = _AGENT_TURNS[key] = asyncio.get_running_loop().create_future()
+        try:
+            reply, llm_ms, llm_model = await _generate_reply(sid, transcript, agent_ws, cfg)
+            if owner is not None:
+                owner.set_result((reply, llm_model))
+        finally:
+            if owner is not None:
+                if _AGENT_TURNS.get(key) is owner:
+                    del _AGENT_TURNS[key]
+                if not owner.done():
+                    owner.set_result(None)  # release duplicates: this turn failed
+
+        # Commit to history + compact once (after both messages)
+        session_store.append(sid, "user", transcript)
+        session_store.append(sid, "assistant", reply)
+        session_store.compact(sid)
+
+        return await _finish_turn(sid, turn_ctx, transcript, reply, start, asr_ms, audio_mode, progress,
+                                  llm_ms=llm_ms, llm_model=llm_model, synth=voice_pipeline.synthesize)
+
+    except session_store.StaleTurn:
+        await bus.publish("turn.stale", {"session_id": sid, "reason": "generation_changed"}, session_id=sid)
+        return ORJSONResponse({"ok": False, "session_id": sid, "stale": True, "detail": "session reset during turn"})
     except HTTPException:
         raise
     except Exception as exc:
@@ -441,49 +596,51 @@ async def api_turn(
 # UI support endpoints
 # ---------------------------------------------------------------------------
 
+# Plain def: these read session files, so FastAPI runs them in its threadpool
 @app.get("/api/sessions")
-async def list_sessions() -> JSONResponse:
-    return JSONResponse(session_store.list_sessions())
+def list_sessions() -> ORJSONResponse:
+    return ORJSONResponse(session_store.list_sessions())
 
 
 @app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str) -> JSONResponse:
+def get_session(session_id: str) -> ORJSONResponse:
     detail = session_store.get_session_detail(session_id)
     if detail is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return JSONResponse(detail)
+    return ORJSONResponse(detail)
 
 
 @app.get("/api/status")
-async def system_status() -> JSONResponse:
-    cfg = config.load()
-    return JSONResponse({
+async def system_status() -> ORJSONResponse:
+    active_count, ended_count = session_store.session_counts()
+    return ORJSONResponse({
         "uptime_s": round(time.time() - _START_TIME),
         "total_calls": _CALL_COUNT,
         "error_count": _ERROR_COUNT,
-        "active_sessions": len(session_store.active_sessions()),
-        "ended_sessions": len(session_store.ended_sessions()),
+        "active_sessions": active_count,
+        "ended_sessions": ended_count,
         "ui_subscribers": bus.subscriber_count,
         "agents": agent_interface.list_agents(),
-        "mlx_audio": voice_pipeline.check_mlx_audio(),
-        "llm": llm_backend.check_health(),
-        "config": {k: v for k, v in cfg.items() if "token" not in k and "key" not in k and "bearer" not in k},
+        # Probes mlx_audio and Piper over HTTP — keep it off the event loop
+        "mlx_audio": await asyncio.to_thread(voice_pipeline.check_mlx_audio),
+        "llm": llm_backend.check_health(),  # no I/O
+        "config": config.safe_view(),
     })
 
 
 @app.post("/api/config")
-async def update_config(request: Request) -> JSONResponse:
+async def update_config(request: Request) -> ORJSONResponse:
     """Hot-reload config from disk."""
-    cfg = config.reload()
+    config.reload()
+    voice_pipeline.clear_tts_cache()
     await bus.publish("status.update", {"event": "config_reloaded"})
-    safe = {k: v for k, v in cfg.items() if "token" not in k and "key" not in k and "bearer" not in k}
-    return JSONResponse({"ok": True, "config": safe})
+    return ORJSONResponse({"ok": True, "config": config.safe_view()})
 
 
 @app.post("/api/call/inject")
-async def call_inject(request: Request) -> JSONResponse:
+async def call_inject(request: Request) -> ORJSONResponse:
     """Inject a TTS message into the active call. Queued for next /api/turn poll."""
-    body = await request.json()
+    body = await _read_json(request)
     text = voice_pipeline.safe_text(str(body.get("text", "")))
     session_id = str(body.get("session_id", ""))
     if not text:
@@ -493,15 +650,8 @@ async def call_inject(request: Request) -> JSONResponse:
         session_id = session_store.most_recent_active_session() or ""
     if not session_id:
         raise HTTPException(status_code=400, detail="no active session")
-    audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, text)
-    audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
-    session_store.queue_inject(session_id, text, audio_b64)
-    await bus.publish("agent.inject", {
-        "text": text,
-        "audio_base64": audio_b64,
-        "tts_ms": round(tts_ms, 1),
-    }, session_id=session_id)
-    return JSONResponse({"ok": True, "tts_ms": round(tts_ms, 1), "session_id": session_id})
+    tts_ms = await _queue_inject(session_id, text)
+    return ORJSONResponse({"ok": True, "tts_ms": round(tts_ms, 1), "session_id": session_id})
 
 
 # ---------------------------------------------------------------------------
@@ -509,57 +659,62 @@ async def call_inject(request: Request) -> JSONResponse:
 # ---------------------------------------------------------------------------
 
 @app.get("/api/instructions")
-async def get_instructions() -> JSONResponse:
-    return JSONResponse(instruction_store.snapshot())
+async def get_instructions() -> ORJSONResponse:
+    return ORJSONResponse(instruction_store.snapshot())
 
 
 @app.post("/api/instructions")
-async def set_base_instruction(request: Request) -> JSONResponse:
+async def set_base_instruction(request: Request) -> ORJSONResponse:
     """Update the default system prompt in config.  All new sessions (and existing
     sessions without a session-scoped override) will use this prompt."""
-    body = await request.json()
+    body = await _read_json(request)
     text = str(body.get("text", ""))
     cfg = config.load()
     cfg["llm_system_prompt"] = text
     config.save()
     await bus.publish("instructions.updated", {"scope": "global"})
-    return JSONResponse({"ok": True, "scope": "global"})
+    return ORJSONResponse({"ok": True, "scope": "global"})
 
 
 @app.post("/api/instructions/{sid}")
-async def set_session_instruction(sid: str, request: Request) -> JSONResponse:
-    body = await request.json()
+async def set_session_instruction(sid: str, request: Request) -> ORJSONResponse:
+    body = await _read_json(request)
     text = str(body.get("text", ""))
     instruction_store.set_session(sid, text)
     await bus.publish("instructions.updated", {"scope": "session", "session_id": sid}, session_id=sid)
-    return JSONResponse({"ok": True, "session_id": sid})
+    return ORJSONResponse({"ok": True, "session_id": sid})
 
 
 @app.post("/api/instructions/{sid}/turn")
-async def set_turn_instruction(sid: str, request: Request) -> JSONResponse:
-    body = await request.json()
+async def set_turn_instruction(sid: str, request: Request) -> ORJSONResponse:
+    body = await _read_json(request)
     text = str(body.get("text", ""))
     instruction_store.set_turn(sid, text)
-    return JSONResponse({"ok": True, "session_id": sid, "scope": "turn"})
+    return ORJSONResponse({"ok": True, "session_id": sid, "scope": "turn"})
 
 
 @app.delete("/api/instructions/{sid}")
-async def clear_session_instruction(sid: str) -> JSONResponse:
+async def clear_session_instruction(sid: str) -> ORJSONResponse:
     instruction_store.clear_session(sid)
     await bus.publish("instructions.updated", {"scope": "session", "session_id": sid}, session_id=sid)
-    return JSONResponse({"ok": True, "session_id": sid})
+    return ORJSONResponse({"ok": True, "session_id": sid})
 
 
 # ---------------------------------------------------------------------------
 # Dial endpoint
 # ---------------------------------------------------------------------------
 
-async def _do_dial(number: str) -> dict:
-    """Send dial command to phone via ADB broadcast."""
-    if not number:
-        return {"ok": False, "detail": "number required"}
-    adb = config.get("adb_path", "adb")
-    # Check ADB connection
+# A successful `adb devices` check is trusted this long (seconds); failures are
+# never cached so a reconnected phone is picked up on the next dial.
+_ADB_DEVICE_TTL = 5.0
+_adb_device_seen = 0.0
+
+
+async def _adb_check_device(adb: str) -> str:
+    """Return an error detail if no ADB device is connected, else ""."""
+    global _adb_device_seen
+    if time.monotonic() - _adb_device_seen < _ADB_DEVICE_TTL:
+        return ""
     try:
         proc = await asyncio.create_subprocess_exec(
             adb, "devices",
@@ -569,78 +724,70 @@ async def _do_dial(number: str) -> dict:
         lines = stdout.decode().strip().split("\n")
         devices = [l for l in lines[1:] if l.strip() and "device" in l]
         if not devices:
-            return {"ok": False, "detail": "No ADB device connected"}
+            return "No ADB device connected"
     except Exception as exc:
-        return {"ok": False, "detail": f"ADB check failed: {exc}"}
-    # Send broadcast
+        return f"ADB check failed: {exc}"
+    _adb_device_seen = time.monotonic()
+    return ""
+
+
+async def _adb_call_command(command: str, *extras: str, label: str) -> dict:
+    """Send a CALL_COMMAND broadcast to the phone bridge app via ADB."""
+    global _adb_device_seen
+    adb = config.get("adb_path", "adb")
+    error = await _adb_check_device(adb)
+    if error:
+        return {"ok": False, "detail": error}
     try:
         proc = await asyncio.create_subprocess_exec(
             adb, "shell", "am", "broadcast",
             "-a", "com.tracsystems.phonebridge.CALL_COMMAND",
             "-n", "com.tracsystems.phonebridge/.CallCommandReceiver",
-            "--es", "type", "dial",
-            "--es", "number", number,
+            "--es", "type", command, *extras,
             stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
         )
         stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=10)
-        output = stdout.decode().strip()
         if proc.returncode != 0:
+            _adb_device_seen = 0.0  # re-check the device on the next command
             return {"ok": False, "detail": f"ADB broadcast failed: {stderr.decode().strip()}"}
-        return {"ok": True, "detail": output}
+        return {"ok": True, "detail": stdout.decode().strip()}
     except Exception as exc:
-        return {"ok": False, "detail": f"Dial failed: {exc}"}
+        return {"ok": False, "detail": f"{label} failed: {exc}"}
+
+
+async def _do_dial(number: str) -> dict:
+    """Send dial command to phone via ADB broadcast."""
+    if not number:
+        return {"ok": False, "detail": "number required"}
+    return await _adb_call_command("dial", "--es", "number", number, label="Dial")
 
 
 @app.post("/api/call/dial")
-async def call_dial(request: Request) -> JSONResponse:
-    body = await request.json()
+async def call_dial(request: Request) -> ORJSONResponse:
+    body = await _read_json(request)
     number = str(body.get("number", "")).strip()
     result = await _do_dial(number)
     if result["ok"]:
         await bus.publish("call.dial", {"number": number})
-    return JSONResponse(result)
+    return ORJSONResponse(result)
 
 
 async def _do_hangup() -> dict:
     """Send hangup command to phone via ADB broadcast."""
-    adb = config.get("adb_path", "adb")
-    try:
-        proc = await asyncio.create_subprocess_exec(
-            adb, "devices",
-            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=5)
-        lines = stdout.decode().strip().split("\n")
-        devices = [l for l in lines[1:] if l.strip() and "device" in l]
-        if not devices:
-            return {"ok": False, "detail": "No ADB device connected"}
-    except Exception as exc:
-        return {"ok": False, "detail": f"ADB check failed: {exc}"}
-    try:
-        proc = await asyncio.create_subprocess_exec(
-            adb, "shell", "am", "broadcast",
-            "-a", "com.tracsystems.phonebridge.CALL_COMMAND",
-            "-n", "com.tracsystems.phonebridge/.CallCommandReceiver",
-            "--es", "type", "hangup",
-            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=10)
-        if proc.returncode != 0:
-            return {"ok": False, "detail": f"ADB broadcast failed: {stderr.decode().strip()}"}
-        return {"ok": True, "detail": stdout.decode().strip()}
-    except Exception as exc:
-        return {"ok": False, "detail": f"Hangup failed: {exc}"}
+    return await _adb_call_command("hangup", label="Hangup")
 
 
 def _single_active_session() -> str:
     """Return the one active session ID if exactly one exists, else empty string."""
-    active = session_store.active_sessions()
-    return next(iter(active)) if len(active) == 1 else ""
+    if session_store.session_counts()[0] != 1:
+        return ""
+    return session_store.first_active() or ""
 
 
 @app.post("/api/call/hangup")
-async def call_hangup(request: Request) -> JSONResponse:
-    body = await request.json() if await request.body() else {}
+async def call_hangup(request: Request) -> ORJSONResponse:
+    raw = await request.body()
+    body = orjson.loads(raw) if raw else {}
     session_id = str(body.get("session_id", "")).strip()
     result = await _do_hangup()
     if result["ok"]:
@@ -650,23 +797,166 @@ async def call_hangup(request: Request) -> JSONResponse:
             await bus.publish("session.ended", {"session_id": sid}, session_id=sid)
             result["session_id"] = sid
         await bus.publish("call.hangup", result)
-    return JSONResponse(result)
+    return ORJSONResponse(result)
 
 
 # ---------------------------------------------------------------------------
 # Agent endpoints
 # ---------------------------------------------------------------------------
 
+async def _agent_takeover(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    ok = await agent_interface.takeover(ws, sid)
+    await _ws_send(ws, {"type": "takeover.ack", "ok": ok, "session_id": sid})
+
+
+async def _agent_release(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    ok = await agent_interface.release(ws, sid)
+    await _ws_send(ws, {"type": "release.ack", "ok": ok, "session_id": sid})
+
+
+async def _agent_inject(ws: WebSocket, msg: dict) -> None:
+    text = voice_pipeline.safe_text(str(msg.get("text", "")))
+    sid = str(msg.get("session_id", ""))
+    if not sid:
+        sid = session_store.first_active() or ""
+    if text and sid:
+        await _queue_inject(sid, text)
+
+
+async def _agent_set_instructions(ws: WebSocket, msg: dict) -> None:
+    text = str(msg.get("instructions", ""))
+    sid = str(msg.get("session_id", ""))
+    scope = str(msg.get("scope", "turn"))
+    if scope == "global":
+        # Global mutable instructions disabled — cross-session bleed risk
+        await _ws_send(ws, {"type": "set_instructions.ack", "ok": False,
+                                "error": "Global scope disabled. Use session or turn scope."})
+    elif scope == "session" and sid:
+        instruction_store.set_session(sid, text)
+        await _ws_send(ws, {"type": "set_instructions.ack", "ok": True, "scope": scope})
+        await bus.publish("instructions.updated", {"scope": scope, "session_id": sid})
+    elif scope == "turn" and sid:
+        instruction_store.set_turn(sid, text)
+        await _ws_send(ws, {"type": "set_instructions.ack", "ok": True, "scope": scope})
+        await bus.publish("instructions.updated", {"scope": scope, "session_id": sid})
+    else:
+        await _ws_send(ws, {"type": "set_instructions.ack", "ok": False,
+                                "error": "Missing session_id for session/turn scope."})
+
+
+async def _agent_set_call_config(ws: WebSocket, msg: dict) -> None:
+    cfg = config.load()
+    for key, value in msg.get("config", {}).items():
+        if key in AGENT_ALLOWED_CALL_KEYS:
+            cfg[key] = value
+    config.save()
+    await _ws_send(ws, {"type": "set_call_config.ack", "ok": True})
+    await bus.publish("config.call_updated", _call_config_response())
+
+
+async def _agent_dial(ws: WebSocket, msg: dict) -> None:
+    number = str(msg.get("number", ""))
+    result = await _do_dial(number)
+    await _ws_send(ws, {"type": "dial.ack", **result})
+    if result["ok"]:
+        await bus.publish("call.dial", {"number": number})
+
+
+async def _agent_hangup(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    result = await _do_hangup()
+    if result["ok"]:
+        target = sid or _single_active_session()
+        if target:
+            session_store.end_session(target)
+            await bus.publish("session.ended", {"session_id": target}, session_id=target)
+            result["session_id"] = target
+        await bus.publish("call.hangup", result)
+    await _ws_send(ws, {"type": "hangup.ack", **result})
+
+
+async def _agent_get_call_state(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    etag = _call_state_etag(sid)
+    if msg.get("etag") == etag:
+        # Poller already holds this state — skip rebuilding and resending it
+        await _ws_send(ws, {"type": "call_state", "session_id": sid, "unchanged": True, "etag": etag})
+        return
+    await _ws_send(ws, {"type": "call_state", **_call_state(sid), "etag": etag})
+
+
+async def _agent_inject_context(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    context = voice_pipeline.safe_text(str(msg.get("context", "")))
+    if sid and context:
+        instruction_store.set_agent_knowledge(sid, context)
+        await _ws_send(ws, {"type": "inject_context.ack", "ok": True})
+        await bus.publish("agent.context_injected", {"session_id": sid}, session_id=sid)
+    else:
+        await _ws_send(ws, {"type": "inject_context.ack", "ok": False})
+
+
+async def _agent_clear_context(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    instruction_store.clear_agent_knowledge(sid)
+    await _ws_send(ws, {"type": "clear_context.ack", "ok": True})
+    await bus.publish("agent.context_cleared", {"session_id": sid}, session_id=sid)
+
+
+async def _agent_end_session(ws: WebSocket, msg: dict) -> None:
+    sid = str(msg.get("session_id", ""))
+    if sid:
+        ok = session_store.end_session(sid)
+        await _ws_send(ws, {"type": "end_session.ack", "ok": ok, "session_id": sid})
+        if ok:
+            await bus.publish("session.ended", {"session_id": sid}, session_id=sid)
+    else:
+        await bus.send(ws, _END_SESSION_NACK_FRAME)
+
+
+async def _agent_ping(ws: WebSocket, msg: dict) -> None:
+    await bus.send(ws, _PONG_FRAME)
+
+
+# Agent WebSocket message type → handler(ws, msg)
+_AGENT_HANDLERS: dict[str, Callable[[WebSocket, dict], Awaitable[None]]] = {
+    "takeover": _agent_takeover,
+    "release": _agent_release,
+    "inject": _agent_inject,
+    "set_instructions": _agent_set_instructions,
+    "set_call_config": _agent_set_call_config,
+    "dial": _agent_dial,
+    "hangup": _agent_hangup,
+    "get_call_state": _agent_get_call_state,
+    "inject_context": _agent_inject_context,
+    "clear_context": _agent_clear_context,
+    "end_session": _agent_end_session,
+    "ping": _agent_ping,
+}
+
+
 @app.websocket("/api/agent/ws")
 async def agent_ws(ws: WebSocket) -> None:
     await ws.accept()
-    await agent_interface.agent_connect(ws)
+    if not await agent_interface.agent_connect(ws):
+        await ws.close(code=1013, reason="Too many agents connected")
+        return
     try:
         while True:
-            raw = await ws.receive_text()
+            # Text or binary frames; binary JSON skips the text-frame UTF-8 check
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            raw = message.get("bytes") or message.get("text")
+            if not raw:
+                continue
             try:
-                msg = json.loads(raw)
-            except json.JSONDecodeError:
+                msg = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                continue
+            if not isinstance(msg, dict):
                 continue
             # --- request_id correlation: catch takeover replies first ---
             request_id = msg.get("request_id")
@@ -675,135 +965,9 @@ async def agent_ws(ws: WebSocket) -> None:
                 agent_interface.resolve_turn_reply(str(request_id), reply_text)
                 continue
 
-            msg_type = str(msg.get("type", ""))
-
-            if msg_type == "takeover":
-                sid = str(msg.get("session_id", ""))
-                ok = await agent_interface.takeover(ws, sid)
-                await ws.send_json({"type": "takeover.ack", "ok": ok, "session_id": sid})
-
-            elif msg_type == "release":
-                sid = str(msg.get("session_id", ""))
-                ok = await agent_interface.release(ws, sid)
-                await ws.send_json({"type": "release.ack", "ok": ok, "session_id": sid})
-
-            elif msg_type == "inject":
-                text = voice_pipeline.safe_text(str(msg.get("text", "")))
-                sid = str(msg.get("session_id", ""))
-                if not sid:
-                    active = list(session_store.active_sessions().keys())
-                    if active:
-                        sid = active[0]
-                if text and sid:
-                    audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, text)
-                    audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
-                    session_store.queue_inject(sid, text, audio_b64)
-                    await bus.publish("agent.inject", {
-                        "text": text,
-                        "audio_base64": audio_b64,
-                        "tts_ms": round(tts_ms, 1),
-                    }, session_id=sid)
-
-            elif msg_type == "set_instructions":
-                text = str(msg.get("instructions", ""))
-                sid = str(msg.get("session_id", ""))
-                scope = str(msg.get("scope", "turn"))
-                if scope == "global":
-                    # Global mutable instructions disabled — cross-session bleed risk
-                    await ws.send_json({"type": "set_instructions.ack", "ok": False,
-                                        "error": "Global scope disabled. Use session or turn scope."})
-                elif scope == "session" and sid:
-                    instruction_store.set_session(sid, text)
-                    await ws.send_json({"type": "set_instructions.ack", "ok": True, "scope": scope})
-                    await bus.publish("instructions.updated", {"scope": scope, "session_id": sid})
-                elif scope == "turn" and sid:
-                    instruction_store.set_turn(sid, text)
-                    await ws.send_json({"type": "set_instructions.ack", "ok": True, "scope": scope})
-                    await bus.publish("instructions.updated", {"scope": scope, "session_id": sid})
-                else:
-                    await ws.send_json({"type": "set_instructions.ack", "ok": False,
-                                        "error": "Missing session_id for session/turn scope."})
-
-            elif msg_type == "set_call_config":
-                cfg = config.load()
-                for key, value in msg.get("config", {}).items():
-                    if key in AGENT_ALLOWED_CALL_KEYS:
-                        cfg[key] = value
-                config.save()
-                await ws.send_json({"type": "set_call_config.ack", "ok": True})
-                await bus.publish("config.call_updated", _call_config_response())
-
-            elif msg_type == "dial":
-                number = str(msg.get("number", ""))
-                result = await _do_dial(number)
-                await ws.send_json({"type": "dial.ack", **result})
-                if result["ok"]:
-                    await bus.publish("call.dial", {"number": number})
-
-            elif msg_type == "hangup":
-                sid = str(msg.get("session_id", ""))
-                result = await _do_hangup()
-                if result["ok"]:
-                    target = sid or _single_active_session()
-                    if target:
-                        session_store.end_session(target)
-                        await bus.publish("session.ended", {"session_id": target}, session_id=target)
-                        result["session_id"] = target
-                    await bus.publish("call.hangup", result)
-                await ws.send_json({"type": "hangup.ack", **result})
-
-            elif msg_type == "get_call_state":
-                sid = str(msg.get("session_id", ""))
-                history = session_store.get_history(sid)
-                meta = session_store.active_sessions().get(sid)
-                ended = session_store.is_ended(sid)
-                all_meta = session_store.all_sessions().get(sid)
-                resp_meta = meta or all_meta
-                await ws.send_json({
-                    "type": "call_state",
-                    "session_id": sid,
-                    "status": "ended" if ended else ("active" if resp_meta else "unknown"),
-                    "ended_at": session_store._ENDED.get(sid) if ended else None,
-                    "history": history,
-                    "turn_count": len(resp_meta.get("turns", [])) if resp_meta else 0,
-                    "instructions": {
-                        "base": instruction_store.get_base(),
-                        "session": instruction_store.get_session(sid),
-                        "pending_turn": instruction_store.get_turn(sid),
-                    },
-                    "agent_takeover": agent_interface.get_takeover_agent(sid) is not None,
-                })
-
-            elif msg_type == "inject_context":
-                sid = str(msg.get("session_id", ""))
-                context = voice_pipeline.safe_text(str(msg.get("context", "")))
-                if sid and context:
-                    async with session_store.get_lock(sid):
-                        instruction_store.set_agent_knowledge(sid, context)
-                    await ws.send_json({"type": "inject_context.ack", "ok": True})
-                    await bus.publish("agent.context_injected", {"session_id": sid}, session_id=sid)
-                else:
-                    await ws.send_json({"type": "inject_context.ack", "ok": False})
-
-            elif msg_type == "clear_context":
-                sid = str(msg.get("session_id", ""))
-                async with session_store.get_lock(sid):
-                    instruction_store.clear_agent_knowledge(sid)
-                await ws.send_json({"type": "clear_context.ack", "ok": True})
-                await bus.publish("agent.context_cleared", {"session_id": sid}, session_id=sid)
-
-            elif msg_type == "end_session":
-                sid = str(msg.get("session_id", ""))
-                if sid:
-                    ok = session_store.end_session(sid)
-                    await ws.send_json({"type": "end_session.ack", "ok": ok, "session_id": sid})
-                    if ok:
-                        await bus.publish("session.ended", {"session_id": sid}, session_id=sid)
-                else:
-                    await ws.send_json({"type": "end_session.ack", "ok": False})
-
-            elif msg_type == "ping":
-                await ws.send_json({"type": "pong"})
+            handler = _AGENT_HANDLERS.get(str(msg.get("type", "")))
+            if handler is not None:
+                await handler(ws, msg)
 
     except WebSocketDisconnect:
         pass
@@ -812,44 +976,35 @@ async def agent_ws(ws: WebSocket) -> None:
 
 
 @app.post("/api/agent/inject")
-async def agent_inject_rest(request: Request) -> JSONResponse:
-    body = await request.json()
+async def agent_inject_rest(request: Request) -> ORJSONResponse:
+    body = await _read_json(request)
     text = voice_pipeline.safe_text(str(body.get("text", "")))
     session_id = str(body.get("session_id", ""))
     if not text:
         raise HTTPException(status_code=400, detail="text required")
     if not session_id:
-        active = list(session_store.active_sessions().keys())
-        if active:
-            session_id = active[0]
+        session_id = session_store.first_active() or ""
     if not session_id:
         raise HTTPException(status_code=400, detail="no active session")
-    audio_bytes, tts_ms = await asyncio.to_thread(voice_pipeline.synthesize, text)
-    audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
-    session_store.queue_inject(session_id, text, audio_b64)
-    await bus.publish("agent.inject", {
-        "text": text,
-        "audio_base64": audio_b64,
-        "tts_ms": round(tts_ms, 1),
-    }, session_id=session_id)
-    return JSONResponse({"ok": True, "tts_ms": round(tts_ms, 1), "session_id": session_id})
+    tts_ms = await _queue_inject(session_id, text)
+    return ORJSONResponse({"ok": True, "tts_ms": round(tts_ms, 1), "session_id": session_id})
 
 
 @app.get("/api/agent/sessions")
-async def agent_sessions() -> JSONResponse:
-    return JSONResponse(list(session_store.active_sessions().keys()))
+async def agent_sessions() -> ORJSONResponse:
+    return ORJSONResponse(session_store.active_session_ids())
 
 
 @app.post("/api/agent/takeover")
-async def agent_takeover_rest(request: Request) -> JSONResponse:
+async def agent_takeover_rest(request: Request) -> ORJSONResponse:
     """REST takeover — only works with connected agent WebSocket. Stubbed for now."""
-    return JSONResponse({"ok": False, "detail": "Use WebSocket /api/agent/ws for takeover"})
+    return ORJSONResponse({"ok": False, "detail": "Use WebSocket /api/agent/ws for takeover"})
 
 
 @app.post("/api/agent/release")
-async def agent_release_rest(request: Request) -> JSONResponse:
+async def agent_release_rest(request: Request) -> ORJSONResponse:
     """REST release — only works with connected agent WebSocket. Stubbed for now."""
-    return JSONResponse({"ok": False, "detail": "Use WebSocket /api/agent/ws for release"})
+    return ORJSONResponse({"ok": False, "detail": "Use WebSocket /api/agent/ws for release"})
 
 
 def _resolve_session(session_id: str) -> str:
@@ -863,10 +1018,10 @@ def _resolve_session(session_id: str) -> str:
 
 
 @app.get("/api/agent/context/{session_id}")
-async def get_agent_context(session_id: str) -> JSONResponse:
+async def get_agent_context(session_id: str) -> ORJSONResponse:
     session_id = _resolve_session(session_id)
     knowledge = instruction_store.get_agent_knowledge(session_id)
-    return JSONResponse({
+    return ORJSONResponse({
         "session_id": session_id,
         "knowledge": knowledge,
         "has_knowledge": bool(knowledge),
@@ -874,25 +1029,23 @@ async def get_agent_context(session_id: str) -> JSONResponse:
 
 
 @app.post("/api/agent/context/{session_id}")
-async def set_agent_context(session_id: str, request: Request) -> JSONResponse:
+async def set_agent_context(session_id: str, request: Request) -> ORJSONResponse:
     session_id = _resolve_session(session_id)
-    body = await request.json()
+    body = await _read_json(request)
     context = voice_pipeline.safe_text(str(body.get("context", "")))
     if not context:
         raise HTTPException(status_code=400, detail="context is required")
-    async with session_store.get_lock(session_id):
-        instruction_store.set_agent_knowledge(session_id, context)
+    instruction_store.set_agent_knowledge(session_id, context)
     await bus.publish("agent.context_injected", {"session_id": session_id}, session_id=session_id)
-    return JSONResponse({"ok": True, "session_id": session_id})
+    return ORJSONResponse({"ok": True, "session_id": session_id})
 
 
 @app.delete("/api/agent/context/{session_id}")
-async def clear_agent_context(session_id: str) -> JSONResponse:
+async def clear_agent_context(session_id: str) -> ORJSONResponse:
     session_id = _resolve_session(session_id)
-    async with session_store.get_lock(session_id):
-        instruction_store.clear_agent_knowledge(session_id)
+    instruction_store.clear_agent_knowledge(session_id)
     await bus.publish("agent.context_cleared", {"session_id": session_id}, session_id=session_id)
-    return JSONResponse({"ok": True, "session_id": session_id})
+    return ORJSONResponse({"ok": True, "session_id": session_id})
 
 
 # ---------------------------------------------------------------------------
@@ -900,22 +1053,22 @@ async def clear_agent_context(session_id: str) -> JSONResponse:
 # ---------------------------------------------------------------------------
 
 _KOKORO_VOICES = {
-    "American Female": [
+    "American Female": (
         "af_heart", "af_alloy", "af_aoede", "af_bella", "af_jessica",
         "af_kore", "af_nicole", "af_nova", "af_river", "af_sarah", "af_sky",
-    ],
-    "American Male": [
+    ),
+    "American Male": (
         "am_adam", "am_echo", "am_eric", "am_fenrir", "am_liam",
         "am_michael", "am_onyx", "am_puck", "am_santa",
-    ],
-    "British Female": ["bf_alice", "bf_emma", "bf_isabella", "bf_lily"],
-    "British Male": ["bm_daniel", "bm_fable", "bm_george", "bm_lewis"],
+    ),
+    "British Female": ("bf_alice", "bf_emma", "bf_isabella", "bf_lily"),
+    "British Male": ("bm_daniel", "bm_fable", "bm_george", "bm_lewis"),
 }
 
 _PIPER_VOICES = {
-    "Male": ["thorsten-high", "thorsten-medium", "thorsten-low", "karlsson-low", "pavoque-low"],
-    "Female": ["eva_k-x_low", "kerstin-low", "ramona-low"],
-    "Emotional": ["thorsten_emotional-medium"],
+    "Male": ("thorsten-high", "thorsten-medium", "thorsten-low", "karlsson-low", "pavoque-low"),
+    "Female": ("eva_k-x_low", "kerstin-low", "ramona-low"),
+    "Emotional": ("thorsten_emotional-medium",),
 }
 
 _PIPER_EMOTIONS = {
@@ -923,12 +1076,24 @@ _PIPER_EMOTIONS = {
     "neutral": 4, "sleepy": 5, "surprised": 6, "whisper": 7,
 }
 
+# Static voice tables (immutable), encoded once and spliced into TTS config bodies/events
+_KOKORO_VOICES_JSON = orjson.Fragment(orjson.dumps(_KOKORO_VOICES))
+_PIPER_VOICES_JSON = orjson.Fragment(orjson.dumps(_PIPER_VOICES))
+_PIPER_EMOTIONS_JSON = orjson.Fragment(orjson.dumps(_PIPER_EMOTIONS))
+_NO_VOICES_JSON = orjson.Fragment(b"{}")
+
 _TTS_ALIAS = {"voice": "tts_voice", "speed": "tts_speed", "lang": "tts_lang"}
 
-_TTS_WRITABLE_KEYS = {
+_TTS_WRITABLE_KEYS = frozenset({
     "tts_voice", "tts_speed", "tts_lang",
     "piper_voice", "piper_speaker", "piper_length_scale",
     "piper_noise_scale", "piper_noise_w", "piper_sentence_silence",
+})
+
+# POST body key → config key, for writable keys only (full names and aliases)
+_TTS_BODY_KEYS = {
+    **{key: key for key in _TTS_WRITABLE_KEYS},
+    **{alias: key for alias, key in _TTS_ALIAS.items() if key in _TTS_WRITABLE_KEYS},
 }
 
 
@@ -943,70 +1108,60 @@ def _tts_config_response() -> dict:
         resp["piper_noise_scale"] = cfg.get("piper_noise_scale", 0.667)
         resp["piper_noise_w"] = cfg.get("piper_noise_w", 0.8)
         resp["piper_sentence_silence"] = cfg.get("piper_sentence_silence", 0.2)
-        resp["voices"] = _PIPER_VOICES
-        resp["emotions"] = _PIPER_EMOTIONS
+        resp["voices"] = _PIPER_VOICES_JSON
+        resp["emotions"] = _PIPER_EMOTIONS_JSON
     else:
         resp["voice"] = cfg.get("tts_voice", "am_adam")
         resp["speed"] = cfg.get("tts_speed", 1.2)
         is_kokoro = "kokoro" in resp["model"].lower()
-        resp["voices"] = _KOKORO_VOICES if is_kokoro else {}
+        resp["voices"] = _KOKORO_VOICES_JSON if is_kokoro else _NO_VOICES_JSON
     return resp
 
 
 @app.get("/api/config/tts")
-async def get_tts_config() -> JSONResponse:
-    return JSONResponse(_tts_config_response())
+async def get_tts_config() -> Response:
+    return _cached_json("tts_config_body", _tts_config_response)
 
 
 @app.post("/api/config/tts")
-async def update_tts_config(request: Request) -> JSONResponse:
-    body = await request.json()
+async def update_tts_config(request: Request) -> Response:
+    body = await _read_json(request)
     cfg = config.load()
     # If switching to German, verify Piper is reachable first
-    lang_key = _TTS_ALIAS.get("lang", "tts_lang")
     new_lang = body.get("lang") or body.get("tts_lang")
     if new_lang == "de" and cfg.get("tts_lang", "en") != "de":
         piper_base = cfg.get("piper_base", "http://127.0.0.1:5123")
         try:
-            probe = httpx.post(piper_base, json={"text": "test"}, timeout=5)
+            probe = await _http().post(piper_base, json={"text": "test"}, timeout=5)
             if probe.status_code != 200:
                 raise Exception(f"HTTP {probe.status_code}")
         except Exception as exc:
-            return JSONResponse(
+            return ORJSONResponse(
                 {"ok": False, "error": f"Piper TTS is not running on {piper_base} — cannot switch to German. Start the gateway with a Piper model to enable German TTS."},
                 status_code=400,
             )
     for body_key, value in body.items():
-        cfg_key = _TTS_ALIAS.get(body_key, body_key)
-        if cfg_key in _TTS_WRITABLE_KEYS:
+        cfg_key = _TTS_BODY_KEYS.get(body_key)
+        if cfg_key:
             cfg[cfg_key] = value
     config.save()
-    resp = _tts_config_response()
-    await bus.publish("config.tts_updated", resp)
-    return JSONResponse({"ok": True, **resp})
+    return await _publish_config("config.tts_updated", "tts_config_body", _tts_config_response)
 
 
-@app.post("/api/tts/preview")
-async def tts_preview(request: Request) -> JSONResponse:
-    body = await request.json()
+async def _preview_audio(body: dict) -> tuple[bytes, dict]:
+    """Synthesize a preview phrase; returns WAV bytes and the settings used."""
     cfg = config.load()
     lang = cfg.get("tts_lang", "en")
 
     if lang == "de":
         text = voice_pipeline.safe_text(str(body.get("text", ""))) or "Hallo, das ist eine Sprachvorschau."
         trimmed = voice_pipeline.trim_for_tts(text)
-        wav_bytes = await asyncio.to_thread(voice_pipeline._synthesize_piper, trimmed)
-        audio_b64 = base64.b64encode(wav_bytes).decode("ascii")
-        return JSONResponse({
-            "ok": True,
-            "audio_base64": audio_b64,
-            "lang": "de",
-            "piper_voice": cfg.get("piper_voice", "thorsten-high"),
-        })
+        wav_bytes = await _run_in(_TTS_POOL, voice_pipeline._synthesize_piper, trimmed)
+        return wav_bytes, {"lang": "de", "piper_voice": cfg.get("piper_voice", "thorsten-high")}
     else:
         text = voice_pipeline.safe_text(str(body.get("text", ""))) or "Hello, this is a voice preview."
-        preview_voice = str(body.get("voice", "")) or config.get("tts_voice", "am_adam")
-        preview_speed = float(body.get("speed", 0)) or config.get("tts_speed", 1.2)
+        preview_voice = str(body.get("voice", "")) or cfg.get("tts_voice", "am_adam")
+        preview_speed = float(body.get("speed", 0)) or cfg.get("tts_speed", 1.2)
 
         mlx_base = cfg["mlx_audio_base"].rstrip("/")
         payload = {
@@ -1017,31 +1172,36 @@ async def tts_preview(request: Request) -> JSONResponse:
             "response_format": "wav",
         }
 
-        response = await asyncio.to_thread(
-            lambda: httpx.post(f"{mlx_base}/v1/audio/speech", json=payload, timeout=180)
-        )
+        response = await _http().post(f"{mlx_base}/v1/audio/speech", json=payload)
         response.raise_for_status()
+        return response.content, {"voice": preview_voice, "speed": preview_speed}
 
-        audio_b64 = base64.b64encode(response.content).decode("ascii")
-        return JSONResponse({
-            "ok": True,
-            "audio_base64": audio_b64,
-            "voice": preview_voice,
-            "speed": preview_speed,
-        })
+
+@app.post("/api/tts/preview")
+async def tts_preview(request: Request) -> ORJSONResponse:
+    wav_bytes, used = await _preview_audio(await _read_json(request))
+    return ORJSONResponse({"ok": True, "audio_base64": _audio_payload(wav_bytes), **used})
+
+
+@app.post("/api/tts/preview/raw")
+async def tts_preview_raw(request: Request) -> Response:
+    """Same as /api/tts/preview, but the body is the WAV itself (no base64)."""
+    wav_bytes, _ = await _preview_audio(await _read_json(request))
+    return Response(wav_bytes, media_type="audio/wav")
 
 
 # ---------------------------------------------------------------------------
 # LLM config endpoints
 # ---------------------------------------------------------------------------
 
-_LLM_PARAM_KEYS = {
+_LLM_PARAM_KEYS = frozenset({
     "llm_max_tokens", "llm_temperature", "llm_top_p", "llm_top_k",
     "llm_repeat_penalty", "llm_stop",
     "llm_top_p_enabled", "llm_top_k_enabled", "llm_context_tokens",
     "max_history_turns",
-}
-_LLM_IDENTITY_KEYS = {"llm_model", "llm_base_url", "llm_api_key"}
+})
+_LLM_IDENTITY_KEYS = frozenset({"llm_model", "llm_base_url", "llm_api_key"})
+_LLM_WRITABLE_KEYS = _LLM_PARAM_KEYS | _LLM_IDENTITY_KEYS
 
 # Short aliases accepted by POST body → config key
 _LLM_ALIAS = {
@@ -1060,6 +1220,12 @@ _LLM_ALIAS = {
     "max_history_turns": "max_history_turns",
 }
 
+# POST body key → config key, for writable keys only (full names and aliases)
+_LLM_BODY_KEYS = {
+    **{key: key for key in _LLM_WRITABLE_KEYS},
+    **{alias: key for alias, key in _LLM_ALIAS.items() if key in _LLM_WRITABLE_KEYS},
+}
+
 
 def _llm_config_response() -> dict:
     cfg = config.load()
@@ -1083,47 +1249,55 @@ def _llm_config_response() -> dict:
 
 
 @app.get("/api/config/llm")
-async def get_llm_config() -> JSONResponse:
-    return JSONResponse(_llm_config_response())
+async def get_llm_config() -> Response:
+    # context_tokens_effective follows the loaded model, not just the config
+    return _cached_json(("llm_config_body", llm_backend.get_context_window()), _llm_config_response)
 
 
 @app.post("/api/config/llm")
-async def update_llm_config(request: Request) -> JSONResponse:
-    body = await request.json()
+async def update_llm_config(request: Request) -> Response:
+    body = await _read_json(request)
     cfg = config.load()
 
     for body_key, value in body.items():
-        cfg_key = _LLM_ALIAS.get(body_key, body_key)
-        if cfg_key in _LLM_PARAM_KEYS | _LLM_IDENTITY_KEYS:
+        cfg_key = _LLM_BODY_KEYS.get(body_key)
+        if cfg_key:
             cfg[cfg_key] = value
 
     config.save()
-    await bus.publish("config.llm_updated", _llm_config_response())
-    return JSONResponse({"ok": True, **_llm_config_response()})
+    return await _publish_config(
+        "config.llm_updated", ("llm_config_body", llm_backend.get_context_window()), _llm_config_response,
+    )
 
 
 # ---------------------------------------------------------------------------
 # Call config endpoints
 # ---------------------------------------------------------------------------
 
-_CALL_CONFIG_KEYS = {
+_CALL_CONFIG_KEYS = frozenset({
     "call_auto_answer", "call_auto_answer_delay_ms",
     "caller_allowlist", "caller_blocklist", "unknown_callers_allowed",
     "greeting_incoming", "greeting_outgoing", "greeting_owner",
     "max_duration_sec", "max_duration_message",
     "auth_passphrase", "auth_reject_message", "auth_max_attempts",
     "keep_history",
-}
+})
 
 # Keys agents are NOT allowed to set via WebSocket
-_CALL_SECURITY_KEYS = {
+_CALL_SECURITY_KEYS = frozenset({
     "auth_passphrase", "auth_reject_message", "auth_max_attempts",
     "caller_allowlist", "caller_blocklist", "unknown_callers_allowed",
-}
+})
 
 AGENT_ALLOWED_CALL_KEYS = (_CALL_CONFIG_KEYS - _CALL_SECURITY_KEYS) | {"tts_voice", "tts_speed"}
 
 
+@lru_cache(maxsize=8)
+def _render_greeting(template: str, owner: str) -> str:
+    """Greeting with ``{owner}`` filled in (keyed on its inputs, so never stale)."""
+    return template.replace("{owner}", owner)
+
+
 def _call_config_response() -> dict:
     cfg = config.load()
     owner = cfg.get("greeting_owner", "the owner")
@@ -1135,8 +1309,8 @@ def _call_config_response() -> dict:
         "caller_allowlist": cfg.get("caller_allowlist", []),
         "caller_blocklist": cfg.get("caller_blocklist", []),
         "unknown_callers_allowed": cfg.get("unknown_callers_allowed", True),
-        "greeting_incoming": greeting_in.replace("{owner}", owner),
-        "greeting_outgoing": greeting_out.replace("{owner}", owner),
+        "greeting_incoming": _render_greeting(greeting_in, owner),
+        "greeting_outgoing": _render_greeting(greeting_out, owner),
         "greeting_incoming_template": greeting_in,
         "greeting_outgoing_template": greeting_out,
         "greeting_owner": owner,
@@ -1150,20 +1324,19 @@ def _call_config_response() -> dict:
 
 
 @app.get("/api/config/call")
-async def get_call_config() -> JSONResponse:
-    return JSONResponse(_call_config_response())
+async def get_call_config() -> Response:
+    return _cached_json("call_config_body", _call_config_response)
 
 
 @app.post("/api/config/call")
-async def update_call_config(request: Request) -> JSONResponse:
-    body = await request.json()
+async def update_call_config(request: Request) -> Response:
+    body = await _read_json(request)
     cfg = config.load()
     for key, value in body.items():
         if key in _CALL_CONFIG_KEYS:
             cfg[key] = value
     config.save()
-    await bus.publish("config.call_updated", _call_config_response())
-    return JSONResponse({"ok": True, **_call_config_response()})
+    return await _publish_config("config.call_updated", "call_config_body", _call_config_response)
 
 
 # ---------------------------------------------------------------------------
@@ -1171,43 +1344,58 @@ async def update_call_config(request: Request) -> JSONResponse:
 # ---------------------------------------------------------------------------
 
 @app.get("/api/caller-history")
-async def list_caller_history() -> JSONResponse:
-    return JSONResponse(session_store.list_caller_histories())
+async def list_caller_history() -> ORJSONResponse:
+    return ORJSONResponse(session_store.list_caller_histories())
 
 
 @app.delete("/api/caller-history/{number}")
-async def delete_caller_history(number: str) -> JSONResponse:
+async def delete_caller_history(number: str) -> ORJSONResponse:
     ok = session_store.delete_caller_history(number)
-    return JSONResponse({"ok": ok, "number": number})
+    return ORJSONResponse({"ok": ok, "number": number})
 
 
 # ---------------------------------------------------------------------------
 # Agent call state endpoint
 # ---------------------------------------------------------------------------
 
-@app.get("/api/agent/call/{sid}")
-async def agent_call_state(sid: str) -> JSONResponse:
-    history = session_store.get_history(sid)
-    meta = session_store.active_sessions().get(sid)
-    ended = session_store.is_ended(sid)
-    all_meta = session_store.all_sessions().get(sid)
-    instructions = {
-        "base": instruction_store.get_base(),
-        "session": instruction_store.get_session(sid),
-        "pending_turn": instruction_store.get_turn(sid),
-    }
-    has_takeover = agent_interface.get_takeover_agent(sid) is not None
-    resp_meta = meta or all_meta
-    return JSONResponse({
+def _call_state(sid: str) -> dict:
+    """Call state shared by the WS ``get_call_state`` reply and the REST endpoint."""
+    meta, ended_at = session_store.snapshot(sid)
+    return {
         "session_id": sid,
-        "status": "ended" if ended else ("active" if resp_meta else "unknown"),
-        "ended_at": session_store._ENDED.get(sid) if ended else None,
-        "history": history,
-        "turn_count": len(resp_meta.get("turns", [])) if resp_meta else 0,
-        "instructions": instructions,
-        "agent_takeover": has_takeover,
-        "created_at": resp_meta.get("created_at") if resp_meta else None,
-    })
+        "status": "ended" if ended_at is not None else ("active" if meta else "unknown"),
+        "ended_at": ended_at,
+        "history": session_store.get_history(sid),
+        "turn_count": len(meta.get("turns", ())) if meta else 0,
+        "instructions": {
+            "base": instruction_store.get_base(),
+            "session": instruction_store.get_session(sid),
+            "pending_turn": instruction_store.get_turn(sid),
+        },
+        "agent_takeover": agent_interface.get_takeover_agent(sid) is not None,
+        "created_at": meta.get("created_at") if meta else None,
+    }
+
+
+def _call_state_etag(sid: str) -> str:
+    """Cheap version tag of _call_state(sid) without building it.
+
+    session_store.state_version covers history, turns and ended state; str
+    hashes are cached, so hashing the instruction texts is O(1) after the
+    first time.
+    """
+    signature = (
+        session_store.state_version(sid),
+        instruction_store.get_base(), instruction_store.get_session(sid),
+        instruction_store.get_turn(sid),
+        agent_interface.get_takeover_agent(sid) is not None,
+    )
+    return format(hash(signature) & 0xFFFFFFFFFFFF, "x")
+
+
+@app.get("/api/agent/call/{sid}")
+async def agent_call_state(sid: str) -> ORJSONResponse:
+    return ORJSONResponse(_call_state(sid))
 
 
 # ---------------------------------------------------------------------------
@@ -1222,11 +1410,14 @@ async def ws_events(ws: WebSocket) -> None:
         while True:
             # Keep connection alive, handle pings
             raw = await ws.receive_text()
+            if raw == _PING_TEXT:
+                await bus.send(ws, _PONG_FRAME)
+                continue
             try:
-                msg = json.loads(raw)
+                msg = orjson.loads(raw)
                 if msg.get("type") == "ping":
-                    await ws.send_json({"type": "pong"})
-            except json.JSONDecodeError:
+                    await bus.send(ws, _PONG_FRAME)
+            except orjson.JSONDecodeError:
                 pass
     except WebSocketDisconnect:
         pass
@@ -1238,22 +1429,57 @@ async def ws_events(ws: WebSocket) -> None:
 # Static files + UI
 # ---------------------------------------------------------------------------
 
+# (ETag, bytes) of static/index.html; re-read only when the file changes
+_INDEX_CACHE: tuple[str, bytes] | None = None
+
+
 @app.get("/", response_class=HTMLResponse)
-async def index() -> HTMLResponse:
+async def index(request: Request) -> Response:
+    global _INDEX_CACHE
     index_path = _STATIC_DIR / "index.html"
-    if not index_path.exists():
+    try:
+        etag = f'"{index_path.stat().st_mtime_ns:x}"'
+    except OSError:
         return HTMLResponse("<html><body><h2>Control Center UI not found</h2></body></html>")
-    return HTMLResponse(index_path.read_text(encoding="utf-8"))
+    if _INDEX_CACHE is None or _INDEX_CACHE[0] != etag:
+        _INDEX_CACHE = (etag, index_path.read_bytes())
+    # no-cache: the browser revalidates each load and gets a 304 until the file changes
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(_INDEX_CACHE[1], headers=headers)
 
 
 # ---------------------------------------------------------------------------
 # Startup
 # ---------------------------------------------------------------------------
 
+def _warm_tts_cache() -> None:
+    """Pre-synthesize the fixed replies so the first rejection or retry prompt is instant."""
+    fixed = (config.get("auth_reject_message", _DEFAULT_REJECT), _AUTH_OK_REPLY, _AUTH_RETRY_REPLY, _UNHEARD_REPLY)
+    for text in fixed:
+        try:
+            voice_pipeline.synthesize_cached(text)
+        except Exception as exc:
+            print(f"[gateway] TTS warm-up skipped: {exc}")
+            return
+
+
 async def _periodic_sweep() -> None:
-    """Background task: sweep stale sessions every 30 seconds."""
+    """Background task: end sessions as their idle deadlines pass.
+
+    Sleeps until the earliest deadline (at most 30 s, so a lowered
+    session_ttl still applies promptly); with no sessions it just waits.
+    """
+    wake = session_store.expiry_wakeup()
     while True:
-        await asyncio.sleep(30)
+        delay = session_store.next_expiry()
+        try:
+            async with asyncio.timeout(None if delay is None else min(delay, 30)):
+                await wake.wait()
+        except TimeoutError:
+            pass
+        wake.clear()
         try:
             stale = session_store.sweep_stale()
             for stale_sid in stale:
@@ -1262,6 +1488,25 @@ async def _periodic_sweep() -> None:
             pass  # Don't crash the background loop
 
 
+async def _preload_llm() -> None:
+    """Load the local model on the LLM pool, so the first turn queues behind it."""
+    global _LLM_PRELOADED, _LLM_PRELOAD_ERROR
+    try:
+        await _run_in(_LLM_POOL, llm_backend.preload)
+    except Exception as exc:
+        # Ready, but degraded: agent takeover still works and each local turn retries the load
+        print(f"[gateway] LLM preload failed: {exc}")
+        _LLM_PRELOAD_ERROR = str(exc) or type(exc).__name__
+    _LLM_PRELOADED = True
+
+
+def _spawn(coro: Awaitable[Any]) -> None:
+    """Run *coro* in the background, keeping the task alive until it finishes."""
+    task = asyncio.ensure_future(coro)
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+
+
 @app.on_event("startup")
 async def startup() -> None:
     cfg = config.load()
@@ -1269,8 +1514,17 @@ async def startup() -> None:
     print(f"[gateway] mlx_audio: {cfg['mlx_audio_base']}")
     backend_type = "local/MLX" if not cfg.get("llm_base_url") else f"remote/{cfg['llm_base_url']}"
     print(f"[gateway] LLM: {cfg['llm_model']} ({backend_type})")
-    llm_backend.preload()
-    asyncio.create_task(_periodic_sweep())
+    _spawn(_preload_llm())
+    _spawn(_periodic_sweep())
+    _spawn(_run_in(_TTS_POOL, _warm_tts_cache))
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    session_store.flush_saves()
+    config.flush_save()
+    if _HTTP is not None:
+        await _HTTP.aclose()
 
 
 # ---------------------------------------------------------------------------
@@ -2,15 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import secrets
 import shutil
+import stat
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Hashable
 
 _CFG_PATH = Path(__file__).resolve().parent / "config.json"
 _LOADED: dict[str, Any] = {}
 
+# Values derived from _LOADED, rebuilt on first use after reload()/save()
+_DERIVED: dict[Hashable, Any] = {}
+
+# Debounced config.json writes (see save())
+_SAVE_PENDING = False
+_SAVE_TASKS: set[asyncio.Task] = set()
+_SAVE_DELAY = 0.5  # seconds
+
 # Maps old split field names → new unified names
 _MIGRATION_MAP = {
     "llm_local_model": "llm_model",
@@ -120,12 +131,25 @@ def _migrate(cfg: dict[str, Any]) -> None:
     # Caller history persistence
     cfg.setdefault("keep_history", False)
 
+    # Agent registry cap (GATEWAY_MAX_AGENTS)
+    cfg.setdefault("max_agents", 1024)
+
+    # Concurrent LLM calls (read at startup); >1 only helps a remote backend
+    cfg.setdefault("llm_workers", 1)
+
+    # Largest accepted turn/ASR upload; it is read into memory whole
+    cfg.setdefault("max_audio_bytes", 4 * 1024 * 1024)
+
+    # Per-turn progress events on the bus (turn.complete is always sent)
+    cfg.setdefault("emit_progress_events", True)
+
     # ADB path — auto-discover if not set
     if not cfg.get("adb_path"):
         cfg["adb_path"] = _find_adb()
 
 
 def load() -> dict[str, Any]:
+    """Return the live config dict. Disk is read once; only reload() reads it again."""
     global _LOADED
     if _LOADED:
         return _LOADED
@@ -148,18 +172,121 @@ def load() -> dict[str, Any]:
 
 def reload() -> dict[str, Any]:
     global _LOADED
+    flush_save()  # don't drop edits that are still waiting to be written
     _LOADED = {}
+    _DERIVED.clear()
     return load()
 
 
+def write_atomic(path: Path, text: str) -> None:
+    """Replace *path* with *text* via a temp file + os.replace.
+
+    Readers never see a half-written file. The existing file's permissions
+    are kept (new files get 0600: config.json holds the bearer token), and
+    a symlinked path keeps its link; the target file is replaced.
+    """
+    target = path.resolve()
+    try:
+        mode = stat.S_IMODE(target.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o600
+    tmp = target.with_name(f".{target.name}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            os.fchmod(f.fileno(), mode)
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _write(text: str) -> None:
+    write_atomic(_CFG_PATH, text)
+
+
 def save() -> None:
-    """Persist current in-memory config to config.json."""
+    """Persist current in-memory config to config.json.
+
+    Derived values are dropped at once.  Inside the event loop the write is
+    debounced and threaded, so a burst of config POSTs writes the file once.
+    """
+    global _SAVE_PENDING
     if not _LOADED:
         return
-    with _CFG_PATH.open("w") as f:
-        json.dump(_LOADED, f, indent=2)
-        f.write("\n")
+    _DERIVED.clear()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write(json.dumps(_LOADED, indent=2) + "\n")
+        return
+    if _SAVE_PENDING:
+        return
+    _SAVE_PENDING = True
+    task = loop.create_task(_deferred_save())
+    _SAVE_TASKS.add(task)
+    task.add_done_callback(_SAVE_TASKS.discard)
+
+
+async def _deferred_save() -> None:
+    global _SAVE_PENDING
+    await asyncio.sleep(_SAVE_DELAY)
+    if not _SAVE_PENDING:
+        return  # flushed meanwhile
+    _SAVE_PENDING = False
+    # Serialize on the loop (handlers mutate the dict there); only the write is threaded
+    text = json.dumps(_LOADED, indent=2) + "\n"
+    await asyncio.to_thread(_write, text)
+
+
+def flush_save() -> None:
+    """Write a debounced save that is still pending (used at shutdown and reload)."""
+    global _SAVE_PENDING
+    if _SAVE_PENDING and _LOADED:
+        _write(json.dumps(_LOADED, indent=2) + "\n")
+    _SAVE_PENDING = False
 
 
 def get(key: str, default: Any = None) -> Any:
     return load().get(key, default)
+
+
+def derived(name: Hashable, build: Callable[[], Any]) -> Any:
+    """Return build() memoized under *name* until the next reload() or save()."""
+    try:
+        return _DERIVED[name]
+    except KeyError:
+        value = _DERIVED[name] = build()
+        return value
+
+
+def _number_set(key: str) -> frozenset[str]:
+    from session_store import normalize_number  # session_store imports config
+    return frozenset(filter(None, (normalize_number(str(n)) for n in get(key, []))))
+
+
+def blocklist_set() -> frozenset[str]:
+    """caller_blocklist as a set of normalized numbers."""
+    return derived("caller_blocklist", lambda: _number_set("caller_blocklist"))
+
+
+def allowlist_set() -> frozenset[str]:
+    """caller_allowlist as a set of normalized numbers."""
+    return derived("caller_allowlist", lambda: _number_set("caller_allowlist"))
+
+
+def safe_view() -> dict[str, Any]:
+    """Config without secrets (token/key/bearer keys), for UI responses. Do not mutate."""
+    return derived("safe_view", lambda: {
+        k: v for k, v in load().items()
+        if "token" not in k and "key" not in k and "bearer" not in k
+    })
+
+
+def expected_auth_header() -> bytes:
+    """The Authorization header value bearer-protected endpoints expect (b"" if auth is off)."""
+    def build() -> bytes:
+        token = get("bearer_token", "")
+        return f"Bearer {token}".encode() if token else b""
+    return derived("auth_header", build)
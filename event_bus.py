@@ -3,46 +3,101 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import time
 from typing import Any
 
+import orjson
 from fastapi import WebSocket
 
+# Frames buffered per subscriber before it is considered stalled and dropped.
+_OUTBOX_SIZE = 256
+
+
+async def _drain(ws: WebSocket, outbox: asyncio.Queue[str]) -> None:
+    """Writer task: the only coroutine sending queued frames on *ws*."""
+    try:
+        while True:
+            payload = await outbox.get()
+            await ws.send_text(payload)
+            # Flush whatever queued up meanwhile back-to-back
+            while not outbox.empty():
+                await ws.send_text(outbox.get_nowait())
+    except Exception:
+        pass  # socket gone — its receive loop notices and unsubscribes
+
+
+async def _close_stalled(ws: WebSocket) -> None:
+    try:
+        await ws.close(code=1013, reason="Event backlog full")
+    except Exception:
+        pass
+
 
 class EventBus:
     def __init__(self) -> None:
-        self._subscribers: set[WebSocket] = set()
-        self._lock = asyncio.Lock()
+        # {ws: outbox}; each subscriber's frames are written by its own task,
+        # so a slow client never stalls the publisher or the other subscribers.
+        self._subscribers: dict[WebSocket, asyncio.Queue[str]] = {}
+        self._writers: dict[WebSocket, asyncio.Task] = {}
+        self._closing: set[asyncio.Task] = set()
 
     async def subscribe(self, ws: WebSocket) -> None:
-        async with self._lock:
-            self._subscribers.add(ws)
+        if ws in self._subscribers:
+            return
+        outbox: asyncio.Queue[str] = asyncio.Queue(maxsize=_OUTBOX_SIZE)
+        self._subscribers[ws] = outbox
+        self._writers[ws] = asyncio.create_task(_drain(ws, outbox))
 
     async def unsubscribe(self, ws: WebSocket) -> None:
-        async with self._lock:
-            self._subscribers.discard(ws)
+        self._subscribers.pop(ws, None)
+        writer = self._writers.pop(ws, None)
+        if writer is not None:
+            writer.cancel()
+
+    async def send(self, ws: WebSocket, payload: str) -> bool:
+        """Send one text frame to *ws*, ordered with the events queued for it.
+
+        Returns False if the frame was dropped because *ws* is stalled (the
+        socket is then being closed); send errors on an unsubscribed socket raise.
+        """
+        outbox = self._subscribers.get(ws)
+        if outbox is None:
+            await ws.send_text(payload)
+            return True
+        try:
+            outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            await self._drop_stalled(ws)
+            return False
+        return True
+
+    async def _drop_stalled(self, ws: WebSocket) -> None:
+        print("[gateway] dropping stalled event subscriber")
+        await self.unsubscribe(ws)
+        # Closing lets the client reconnect instead of silently missing events
+        task = asyncio.create_task(_close_stalled(ws))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
 
-    async def publish(self, event_type: str, data: dict[str, Any] | None = None, session_id: str = "") -> None:
+    async def publish(
+        self, event_type: str, data: dict[str, Any] | bytes | None = None, session_id: str = "",
+    ) -> None:
+        """Broadcast an event.  ``data`` may be pre-encoded JSON bytes, spliced in as-is."""
         event = {
             "type": event_type,
             "timestamp": time.time(),
             "session_id": session_id,
-            "data": data or {},
+            "data": orjson.Fragment(data) if isinstance(data, bytes) else (data or {}),
         }
-        payload = json.dumps(event, default=str)
-        dead: list[WebSocket] = []
-        async with self._lock:
-            subscribers = list(self._subscribers)
-        for ws in subscribers:
+        payload = orjson.dumps(event, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        stalled: list[WebSocket] = []
+        for ws, outbox in self._subscribers.items():
             try:
-                await ws.send_text(payload)
-            except Exception:
-                dead.append(ws)
-        if dead:
-            async with self._lock:
-                for ws in dead:
-                    self._subscribers.discard(ws)
+                outbox.put_nowait(payload)
+            except asyncio.QueueFull:
+                stalled.append(ws)
+        for ws in stalled:
+            await self._drop_stalled(ws)
 
     @property
     def subscriber_count(self) -> int:
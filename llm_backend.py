@@ -59,16 +59,13 @@ def get_context_window() -> int:
 
 
 def preload() -> None:
-    """Preload local MLX model at startup."""
+    """Preload local MLX model at startup. Raises if the model cannot be loaded."""
     cfg = config.load()
     if not _is_local(cfg):
         return
-    try:
-        _ensure_local_llm(cfg)
-        ctx = f", context_window={_LOCAL_CONTEXT_WINDOW}" if _LOCAL_CONTEXT_WINDOW else ""
-        print(f"[gateway] LLM preloaded: {cfg['llm_model']}{ctx}")
-    except Exception as exc:
-        print(f"[gateway] LLM preload failed: {exc}")
+    _ensure_local_llm(cfg)
+    ctx = f", context_window={_LOCAL_CONTEXT_WINDOW}" if _LOCAL_CONTEXT_WINDOW else ""
+    print(f"[gateway] LLM preloaded: {cfg['llm_model']}{ctx}")
 
 
 def generate(messages: list[dict[str, str]]) -> tuple[str, float, str]:
@@ -171,7 +168,12 @@ def _extract_openai_text(payload: dict[str, Any]) -> str:
 
 
 def check_health() -> dict:
-    """Check LLM backend health."""
+    """Check LLM backend health.
+
+    No I/O for either backend (config and in-memory load state only, the
+    remote endpoint is not probed), so it is safe to call on the event loop.
+    Keep it that way, or move its callers in app.py to a thread.
+    """
     cfg = config.load()
     if _is_local(cfg):
         return {
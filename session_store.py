@@ -3,15 +3,18 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
+import itertools
 import json
+import secrets
 import time
-import uuid
 from pathlib import Path
 from typing import Any
 
-import re
-
+import agent_interface
 import config
+import instruction_store
+import llm_backend
 
 _SESSIONS_DIR = Path(__file__).resolve().parent / "sessions"
 _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
@@ -43,8 +46,8 @@ _LAST_ACTIVITY: dict[str, float] = {}
 # Per-session asyncio locks for concurrent access coordination
 _SESSION_LOCKS: dict[str, asyncio.Lock] = {}
 
-# Pending TTS inject queue: {session_id: [{"text": str, "audio_base64": str}, ...]}
-_INJECT_QUEUE: dict[str, list[dict[str, str]]] = {}
+# Pending TTS inject queue: {session_id: [{"text": str, "audio": bytes}, ...]}
+_INJECT_QUEUE: dict[str, list[dict[str, Any]]] = {}
 
 # Stale session TTL in seconds (no activity → auto-end)
 _SESSION_TTL = 300  # 5 minutes
@@ -52,6 +55,11 @@ _SESSION_TTL = 300  # 5 minutes
 # Session generation counter — bumped on reset to invalidate in-flight turns
 _GENERATION: dict[str, int] = {}
 
+# State version per session — a fresh value from one global sequence whenever the
+# history, turns or ended state change (never reused, even across a reset)
+_VERSION: dict[str, int] = {}
+_VERSION_SEQ = itertools.count(1)
+
 
 def get_lock(session_id: str) -> asyncio.Lock:
     """Return a per-session asyncio lock, creating if needed."""
@@ -71,15 +79,43 @@ def bump_generation(session_id: str) -> int:
     return _GENERATION[session_id]
 
 
-def queue_inject(session_id: str, text: str, audio_base64: str) -> None:
-    """Queue a TTS inject for delivery on next /api/turn poll."""
+def _changed(session_id: str) -> None:
+    _VERSION[session_id] = next(_VERSION_SEQ)
+
+
+def state_version(session_id: str) -> int:
+    """Version of the session's history/turns/ended state; changes on every update."""
+    return _VERSION.get(session_id, 0)
+
+
+class StaleTurn(Exception):
+    """A session was reset or ended while one of its turns was in flight."""
+
+
+class SessionTurnCtx:
+    """Generation snapshot taken when a turn starts."""
+
+    __slots__ = ("session_id", "generation")
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.generation = _GENERATION.get(session_id, 0)
+
+    def check(self) -> None:
+        """Raise StaleTurn if the session moved on since the turn started."""
+        if _GENERATION.get(self.session_id, 0) != self.generation:
+            raise StaleTurn(self.session_id)
+
+
+def queue_inject(session_id: str, text: str, audio: bytes) -> None:
+    """Queue a TTS inject (raw WAV bytes) for delivery on next /api/turn poll."""
     _INJECT_QUEUE.setdefault(session_id, []).append({
         "text": text,
-        "audio_base64": audio_base64,
+        "audio": audio,
     })
 
 
-def drain_inject(session_id: str) -> dict[str, str] | None:
+def drain_inject(session_id: str) -> dict[str, Any] | None:
     """Pop the next pending inject for a session, or None if empty."""
     q = _INJECT_QUEUE.get(session_id)
     if q:
@@ -89,14 +125,17 @@ def drain_inject(session_id: str) -> dict[str, str] | None:
 
 def get_or_create(session_id: str | None = None) -> str:
     if not session_id:
-        session_id = uuid.uuid4().hex
+        session_id = secrets.token_hex(16)
     _HISTORY.setdefault(session_id, [])
     if session_id not in _META:
+        now = time.time()
         _META[session_id] = {
             "session_id": session_id,
-            "created_at": time.time(),
+            "created_at": now,
             "turns": [],
         }
+        _queue_expiry(session_id, now)
+        _changed(session_id)
     return session_id
 
 
@@ -121,7 +160,6 @@ def reset(session_id: str) -> str:
     _LAST_ACTIVITY.pop(session_id, None)
     _INJECT_QUEUE.pop(session_id, None)
     # Clean up ALL instruction state for this session
-    import instruction_store
     instruction_store.clear_all_for_session(session_id)
     return get_or_create(session_id)
 
@@ -132,6 +170,13 @@ def get_history(session_id: str) -> list[dict[str, str]]:
 
 def append(session_id: str, role: str, content: str) -> None:
     _HISTORY.setdefault(session_id, []).append({"role": role, "content": content})
+    _changed(session_id)
+
+
+def extend_history(session_id: str, messages: list[dict[str, str]]) -> None:
+    """Append several history messages at once (e.g. a restored caller history)."""
+    _HISTORY.setdefault(session_id, []).extend(messages)
+    _changed(session_id)
 
 
 def compact(session_id: str) -> None:
@@ -150,7 +195,6 @@ def compact(session_id: str) -> None:
     # Token budget: use explicit config, or auto-detect from loaded model
     context_limit = config.get("llm_context_tokens", 0)
     if context_limit <= 0:
-        import llm_backend
         context_limit = llm_backend.get_context_window()
     if context_limit > 0:
         reserve = config.get("llm_max_tokens", 400) + 300  # output + system prompt headroom
@@ -180,7 +224,6 @@ def compact(session_id: str) -> None:
     summary_input = "\n".join(summary_input_parts)
 
     # Use LLM to summarize
-    import llm_backend
     messages = [
         {"role": "system", "content": (
             "Summarize this phone conversation history into a concise paragraph. "
@@ -202,6 +245,7 @@ def compact(session_id: str) -> None:
 
     # Replace history with just the recent messages
     _HISTORY[session_id] = list(recent)
+    _changed(session_id)
 
 
 def get_summary(session_id: str) -> str:
@@ -209,6 +253,10 @@ def get_summary(session_id: str) -> str:
     return _SUMMARY.get(session_id, "")
 
 
+def set_summary(session_id: str, summary: str) -> None:
+    _SUMMARY[session_id] = summary
+
+
 def record_turn(session_id: str, turn_data: dict[str, Any]) -> None:
     """Record a completed turn for session log persistence."""
     meta = _META.get(session_id)
@@ -216,6 +264,7 @@ def record_turn(session_id: str, turn_data: dict[str, Any]) -> None:
         get_or_create(session_id)
         meta = _META[session_id]
     meta["turns"].append({**turn_data, "timestamp": time.time()})
+    _changed(session_id)
 
 
 def save_session(session_id: str) -> None:
@@ -224,7 +273,42 @@ def save_session(session_id: str) -> None:
     if not meta:
         return
     path = _SESSIONS_DIR / f"{session_id}.json"
-    path.write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+    config.write_atomic(path, json.dumps(meta, indent=2, default=str))
+
+
+# Debounced saves: sessions with a write scheduled, and the tasks doing it
+_PENDING_SAVES: set[str] = set()
+_SAVE_TASKS: set[asyncio.Task] = set()
+_SAVE_DELAY = 0.2  # seconds
+
+
+def schedule_save(session_id: str) -> None:
+    """Persist a session shortly, off the caller's path. Bursts coalesce into one write."""
+    if session_id in _PENDING_SAVES:
+        return
+    _PENDING_SAVES.add(session_id)
+    task = asyncio.get_running_loop().create_task(_deferred_save(session_id))
+    _SAVE_TASKS.add(task)
+    task.add_done_callback(_SAVE_TASKS.discard)
+
+
+async def _deferred_save(session_id: str) -> None:
+    await asyncio.sleep(_SAVE_DELAY)
+    _PENDING_SAVES.discard(session_id)
+    meta = _META.get(session_id)
+    if not meta:
+        return
+    # Serialize on the loop (turns mutate meta there); only the write is threaded
+    text = json.dumps(meta, indent=2, default=str)
+    path = _SESSIONS_DIR / f"{session_id}.json"
+    await asyncio.to_thread(config.write_atomic, path, text)
+
+
+def flush_saves() -> None:
+    """Write every session with a debounced save still pending (used at shutdown)."""
+    for session_id in list(_PENDING_SAVES):
+        save_session(session_id)
+    _PENDING_SAVES.clear()
 
 
 def list_sessions() -> list[dict[str, Any]]:
@@ -261,13 +345,29 @@ def active_sessions() -> dict[str, dict[str, Any]]:
     return {sid: meta for sid, meta in _META.items() if sid not in _ENDED}
 
 
+def active_session_ids() -> list[str]:
+    """IDs of active (not ended) sessions, oldest first — no metadata copies."""
+    return [sid for sid in _META if sid not in _ENDED]
+
+
+def first_active() -> str | None:
+    """The oldest active session ID, or None."""
+    return next((sid for sid in _META if sid not in _ENDED), None)
+
+
+def session_counts() -> tuple[int, int]:
+    """Return ``(active, ended)`` in-memory session counts in O(1)."""
+    # _ENDED only ever holds sessions that are also in _META
+    return len(_META) - len(_ENDED), len(_ENDED)
+
+
 def most_recent_active_session() -> str | None:
     """Return session_id of the most recently active session (by last activity), or None."""
-    active = {sid: _LAST_ACTIVITY.get(sid, _META[sid].get("created_at", 0))
-              for sid in _META if sid not in _ENDED}
-    if not active:
-        return None
-    return max(active, key=active.get)
+    return max(
+        (sid for sid in _META if sid not in _ENDED),
+        key=lambda sid: _LAST_ACTIVITY.get(sid) or _META[sid].get("created_at", 0),
+        default=None,
+    )
 
 
 def ended_sessions() -> dict[str, dict[str, Any]]:
@@ -289,6 +389,7 @@ def end_session(session_id: str) -> bool:
     if session_id not in _META or session_id in _ENDED:
         return False
     _ENDED[session_id] = time.time()
+    _changed(session_id)
     bump_generation(session_id)  # invalidate any in-flight turns
     save_session(session_id)
     # Save caller history if keep_history is enabled and caller is known
@@ -300,16 +401,11 @@ def end_session(session_id: str) -> bool:
             summary = _SUMMARY.get(session_id, "")
             save_caller_history(number, history, summary)
     # Clean up ALL instruction/knowledge state so nothing bleeds into future sessions
-    import instruction_store
     instruction_store.clear_all_for_session(session_id)
     # Drain any pending TTS inject queue
     _INJECT_QUEUE.pop(session_id, None)
     # Release agent takeover if any
-    import agent_interface
-    for ws in list(agent_interface._AGENTS):
-        if session_id in agent_interface._AGENTS[ws].get("takeover_sessions", set()):
-            agent_interface._TAKEOVER.pop(session_id, None)
-            agent_interface._AGENTS[ws]["takeover_sessions"].discard(session_id)
+    agent_interface.release_session(session_id)
     return True
 
 
@@ -317,9 +413,52 @@ def is_ended(session_id: str) -> bool:
     return session_id in _ENDED
 
 
+def snapshot(session_id: str) -> tuple[dict[str, Any] | None, float | None]:
+    """Return ``(meta, ended_at)`` for a session in one pass (no dict copies).
+
+    ``meta`` is the in-memory metadata (active or ended) or None;
+    ``ended_at`` is None unless the session has ended.
+    """
+    return _META.get(session_id), _ENDED.get(session_id)
+
+
+# Min-heap of (last_activity, session_id) driving the stale sweep, with at
+# most one entry per session.  An entry goes out of date when the session is
+# touched again; sweep_stale() re-queues it at its real last activity.
+_EXPIRY: list[tuple[float, str]] = []
+_EXPIRY_QUEUED: set[str] = set()
+_EXPIRY_WAKE: asyncio.Event | None = None
+
+
+def _queue_expiry(session_id: str, last_activity: float) -> None:
+    if session_id in _EXPIRY_QUEUED:
+        return
+    _EXPIRY_QUEUED.add(session_id)
+    heapq.heappush(_EXPIRY, (last_activity, session_id))
+    if _EXPIRY_WAKE is not None and _EXPIRY[0][1] == session_id:
+        _EXPIRY_WAKE.set()  # new earliest deadline — wake the sweeper
+
+
+def expiry_wakeup() -> asyncio.Event:
+    """Event set whenever the earliest expiry moves; call from the sweeper task."""
+    global _EXPIRY_WAKE
+    _EXPIRY_WAKE = asyncio.Event()
+    return _EXPIRY_WAKE
+
+
+def next_expiry() -> float | None:
+    """Seconds until the earliest session could go stale, or None if none can."""
+    if not _EXPIRY:
+        return None
+    ttl = config.get("session_ttl", _SESSION_TTL)
+    return max(0.0, _EXPIRY[0][0] + ttl - time.time())
+
+
 def touch(session_id: str) -> None:
     """Update last-activity timestamp for a session."""
-    _LAST_ACTIVITY[session_id] = time.time()
+    now = time.time()
+    _LAST_ACTIVITY[session_id] = now
+    _queue_expiry(session_id, now)
 
 
 def sweep_stale() -> list[str]:
@@ -327,13 +466,17 @@ def sweep_stale() -> list[str]:
     now = time.time()
     ttl = config.get("session_ttl", _SESSION_TTL)
     stale = []
-    for sid in list(_META):
-        if sid in _ENDED:
+    while _EXPIRY and now - _EXPIRY[0][0] > ttl:
+        _, sid = heapq.heappop(_EXPIRY)
+        _EXPIRY_QUEUED.discard(sid)
+        if sid not in _META or sid in _ENDED:
             continue
         last = _LAST_ACTIVITY.get(sid, _META[sid].get("created_at", now))
         if now - last > ttl:
             stale.append(sid)
             end_session(sid)
+        else:
+            _queue_expiry(sid, last)
     return stale
 
 
@@ -378,14 +521,19 @@ def clear_auth_state(session_id: str) -> None:
 # Caller history persistence
 # ---------------------------------------------------------------------------
 
-def _normalize_number(number: str) -> str:
+# Same characters as the old r"[\s\-\(\)]" pattern: every str.isspace()
+# code point (all of them are below U+3001) plus dashes and parens.
+_PHONE_STRIP = {c: None for c in range(0x3001) if chr(c).isspace()} | dict.fromkeys(map(ord, "-()"))
+
+
+def normalize_number(number: str) -> str:
     """Normalize a phone number for consistent file naming (strip whitespace, dashes, parens)."""
-    return re.sub(r"[\s\-\(\)]", "", number)
+    return number.translate(_PHONE_STRIP)
 
 
 def save_caller_history(number: str, history: list, summary: str) -> None:
     """Persist conversation history for a caller number."""
-    normalized = _normalize_number(number)
+    normalized = normalize_number(number)
     if not normalized:
         return
     path = _CALLER_HISTORY_DIR / f"{normalized}.json"
@@ -403,7 +551,7 @@ def save_caller_history(number: str, history: list, summary: str) -> None:
 
 def load_caller_history(number: str) -> dict | None:
     """Load persisted caller history. Returns dict with history/summary/total_calls/last_call_at or None."""
-    normalized = _normalize_number(number)
+    normalized = normalize_number(number)
     if not normalized:
         return None
     path = _CALLER_HISTORY_DIR / f"{normalized}.json"
@@ -422,7 +570,7 @@ def _load_caller_file(path: Path) -> dict | None:
 
 def delete_caller_history(number: str) -> bool:
     """Delete persisted caller history. Returns True if file existed."""
-    normalized = _normalize_number(number)
+    normalized = normalize_number(number)
     if not normalized:
         return False
     path = _CALLER_HISTORY_DIR / f"{normalized}.json"
@@ -447,3 +595,35 @@ def list_caller_histories() -> list[dict]:
         except (json.JSONDecodeError, OSError):
             continue
     return histories
+
+
+# ---------------------------------------------------------------------------
+# Turn audio handoff (GET /api/audio/{token})
+# ---------------------------------------------------------------------------
+
+# Reply audio awaiting download: {token: (wav_bytes, expires_at)}.
+# Insertion order is expiry order, so eviction only ever looks at the front.
+_AUDIO: dict[str, tuple[bytes, float]] = {}
+_AUDIO_TTL = 120  # seconds
+_AUDIO_MAX = 64
+
+
+def put_audio(wav: bytes) -> str:
+    """Park reply audio for download. Returns the token to fetch it with."""
+    now = time.monotonic()
+    while _AUDIO:
+        oldest = next(iter(_AUDIO))
+        if len(_AUDIO) < _AUDIO_MAX and _AUDIO[oldest][1] > now:
+            break
+        del _AUDIO[oldest]
+    token = secrets.token_urlsafe(16)
+    _AUDIO[token] = (wav, now + _AUDIO_TTL)
+    return token
+
+
+def get_audio(token: str) -> bytes | None:
+    """Return parked audio for *token*, or None if unknown or expired."""
+    entry = _AUDIO.get(token)
+    if entry is None or entry[1] <= time.monotonic():
+        return None
+    return entry[0]
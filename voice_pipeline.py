@@ -5,12 +5,18 @@ from __future__ import annotations
 import mimetypes
 import re
 import time
-from pathlib import Path
+from functools import lru_cache
+from typing import BinaryIO
 
 import httpx
 
 import config
 
+# One keep-alive client for mlx_audio and Piper: each turn's ASR and TTS calls
+# reuse pooled connections instead of opening a new one.  httpx.Client is
+# thread-safe, so the ASR/TTS worker threads share it.
+_HTTP = httpx.Client(timeout=180)
+
 _SPOKEN_ALLOWED_RE = re.compile(r"[^\w\s\.,!?;:'\"()\-\n]", re.UNICODE)
 
 
@@ -43,17 +49,22 @@ safe_text = _safe_text
 trim_for_tts = _trim_for_tts
 
 
-def transcribe(file_path: Path) -> tuple[str, float]:
-    """Run ASR on audio file via mlx_audio. Returns (transcript, asr_ms)."""
+def transcribe_fileobj(fileobj: BinaryIO, filename: str) -> tuple[str, float]:
+    """Run ASR on an open binary file (e.g. an upload's spool). Returns (transcript, asr_ms).
+
+    The file is read from its current position; *filename* only supplies
+    the name and content type sent to mlx_audio.
+    """
     cfg = config.load()
     base = cfg["mlx_audio_base"].rstrip("/")
     start = time.perf_counter()
 
-    content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
-    with file_path.open("rb") as f:
-        files = {"file": (file_path.name, f, content_type)}
-        data = {"model": cfg["stt_model"], "language": cfg["stt_language"]}
-        response = httpx.post(f"{base}/v1/audio/transcriptions", files=files, data=data, timeout=180)
+    # The upload is read fully once (app.py caps it at max_audio_bytes) rather
+    # than letting httpx probe fileno(), which would roll an in-memory spool to disk.
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    files = {"file": (filename, fileobj.read(), content_type)}
+    data = {"model": cfg["stt_model"], "language": cfg["stt_language"]}
+    response = _HTTP.post(f"{base}/v1/audio/transcriptions", files=files, data=data)
 
     response.raise_for_status()
     payload = response.json()
@@ -87,7 +98,7 @@ def _synthesize_piper(text: str) -> bytes:
     speaker = cfg.get("piper_speaker", 0)
     if speaker:
         payload["speaker_id"] = speaker
-    response = httpx.post(piper_base, json=payload, timeout=30)
+    response = _HTTP.post(piper_base, json=payload, timeout=30)
     response.raise_for_status()
     return response.content
 
@@ -108,13 +119,38 @@ def synthesize(text: str) -> tuple[bytes, float]:
             "speed": cfg["tts_speed"],
             "response_format": "wav",
         }
-        resp = httpx.post(f"{base}/v1/audio/speech", json=payload, timeout=180)
+        resp = _HTTP.post(f"{base}/v1/audio/speech", json=payload)
         resp.raise_for_status()
         wav = resp.content
 
     return wav, (time.perf_counter() - start) * 1000
 
 
+def _voice_key(cfg: dict) -> tuple:
+    """Every config value that changes what synthesize() produces for a text."""
+    if cfg.get("tts_lang", "en") == "de":
+        return ("de", cfg.get("piper_base"), cfg.get("piper_voice"), cfg.get("piper_speaker", 0),
+                cfg.get("piper_length_scale", 1.0), cfg.get("piper_noise_scale", 0.667),
+                cfg.get("piper_noise_w", 0.8), cfg.get("piper_sentence_silence", 0.2))
+    return ("en", cfg["tts_model"], cfg["tts_voice"], cfg["tts_speed"])
+
+
+@lru_cache(maxsize=64)
+def _synthesize_cached(text: str, voice_key: tuple) -> bytes:
+    return synthesize(text)[0]
+
+
+def synthesize_cached(text: str) -> tuple[bytes, float]:
+    """synthesize() for repeated prompts (reject/auth/forced replies), memoized per voice setting."""
+    start = time.perf_counter()
+    wav = _synthesize_cached(text, _voice_key(config.load()))
+    return wav, (time.perf_counter() - start) * 1000
+
+
+def clear_tts_cache() -> None:
+    _synthesize_cached.cache_clear()
+
+
 def check_mlx_audio() -> dict:
     """Check mlx_audio + Piper server health. Returns model list or error."""
     cfg = config.load()
@@ -122,7 +158,7 @@ def check_mlx_audio() -> dict:
     # mlx_audio
     base = cfg["mlx_audio_base"].rstrip("/")
     try:
-        response = httpx.get(f"{base}/v1/models", timeout=8)
+        response = _HTTP.get(f"{base}/v1/models", timeout=8)
         response.raise_for_status()
         models = (response.json() or {}).get("data", [])
         result["mlx_audio"] = {"ok": True, "models": [m.get("id") for m in models]}
@@ -131,7 +167,7 @@ def check_mlx_audio() -> dict:
     # Piper
     piper_base = cfg.get("piper_base", "http://127.0.0.1:5123")
     try:
-        resp = httpx.post(piper_base, json={"text": "test"}, timeout=8)
+        resp = _HTTP.post(piper_base, json={"text": "test"}, timeout=8)
         result["piper"] = {"ok": resp.status_code == 200}
     except Exception as exc:
         result["piper"] = {"ok": False, "error": str(exc)}